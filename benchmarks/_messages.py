@@ -0,0 +1,66 @@
+"""Sample pwnios messages shared by the benchmarks."""
+import base64
+import random
+import struct
+import time
+import zlib
+
+from _stubs import StubAgent, make_access_points
+
+
+def fake_png(width=128, height=64):
+    """Small grayscale PNG with some noise, comparable in size to a pwnagotchi face asset."""
+    rng = random.Random(0)
+    rows = b''.join(
+        b'\x00' + bytes(255 if ((x // 8 + y // 8) % 3 and rng.random() > 0.1) else rng.randrange(64)
+                        for x in range(width))
+        for y in range(height)
+    )
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows, 9)) + chunk(b'IEND', b'')
+
+
+def sample_messages(pwnios):
+    """Representative instance of each message type pwnios sends, keyed by name."""
+    plugin = pwnios.PwnIOS()
+    plugin.options = {}
+    plugin.agent = StubAgent(access_points=50)
+    face, status = plugin._get_current_face_and_status()
+    png = fake_png()
+
+    index = pwnios._AccessPointIndex()
+    scan = make_access_points(300)
+    index.update(scan)
+    for ap in scan[:30]:
+        ap['rssi'] -= 3
+    ap_delta = index.update(scan[:290])
+
+    gps = {'enabled': True, 'latitude': 45.421532, 'longitude': -75.697189, 'accuracy': 4.8,
+           'last_update': '2026-01-01T12:00:00.000000'}
+
+    messages = {
+        'keepalive': {"type": "keepalive", "timestamp": time.time()},
+        'pong': {"type": "pong", "timestamp": time.time()},
+        'channel_hop': {"type": "channel_hop", "data": {"channel": 11}},
+        'gps_update': {"type": "gps_update", "data": gps},
+        'handshake': {"type": "handshake", "data": {
+            'filename': '/home/pi/handshakes/MyNetwork_aabbccddeeff.pcap',
+            'access_point': 'aa:bb:cc:dd:ee:ff', 'client_station': '11:22:33:44:55:66',
+            'timestamp': '2026-01-01T12:00:00.000000',
+            'gps': {'latitude': 45.421532, 'longitude': -75.697189, 'accuracy': 4.8}},
+            "face": face, "status": status},
+        'stats': {"type": "stats", "data": plugin._get_stats_from_agent(), "face": face,
+                  "status": status, "timestamp": time.time()},
+        'wifi_update': {"type": "wifi_update", "data": {
+            "count": 50, "access_points": [pwnios._format_access_point(ap) for ap in plugin.agent.access_points[:10]]}},
+        'access_points_50': {"type": "access_points", "data": [pwnios._format_access_point(ap) for ap in plugin.agent.access_points]},
+        'access_points_300': {"type": "access_points", "data": [pwnios._format_access_point(ap) for ap in scan]},
+        'ap_delta': {"type": "ap_delta", "data": ap_delta},
+        'face_image_json': {"type": "face_image", "data": base64.b64encode(png).decode('utf-8'),
+                            "face": face, "status": status, "timestamp": time.time()},
+    }
+    return messages, png, face, status
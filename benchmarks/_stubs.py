@@ -0,0 +1,93 @@
+"""Offline stand-ins for the pwnagotchi runtime so pwnios can be imported and driven off-device."""
+import os
+import random
+import sys
+import time
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def install_pwnagotchi_stubs():
+    """Registers minimal pwnagotchi modules in sys.modules unless the real package is importable."""
+    try:
+        import pwnagotchi.plugins  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    started = time.time()
+
+    pwnagotchi = types.ModuleType('pwnagotchi')
+    pwnagotchi.uptime = lambda: int(time.time() - started)
+
+    plugins = types.ModuleType('pwnagotchi.plugins')
+    plugins.Plugin = type('Plugin', (), {})
+
+    ui = types.ModuleType('pwnagotchi.ui')
+    fonts = types.ModuleType('pwnagotchi.ui.fonts')
+    fonts.Small = None
+    components = types.ModuleType('pwnagotchi.ui.components')
+    components.LabeledValue = type('LabeledValue', (), {'__init__': lambda self, *a, **k: None})
+    view = types.ModuleType('pwnagotchi.ui.view')
+    view.BLACK = 0
+
+    pwnagotchi.plugins = plugins
+    pwnagotchi.ui = ui
+    ui.fonts, ui.components, ui.view = fonts, components, view
+    sys.modules.update({
+        'pwnagotchi': pwnagotchi,
+        'pwnagotchi.plugins': plugins,
+        'pwnagotchi.ui': ui,
+        'pwnagotchi.ui.fonts': fonts,
+        'pwnagotchi.ui.components': components,
+        'pwnagotchi.ui.view': view,
+    })
+
+
+def import_pwnios():
+    install_pwnagotchi_stubs()
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import pwnios
+    return pwnios
+
+
+def make_access_points(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        'mac': ':'.join(f"{rng.randrange(256):02x}" for _ in range(6)),
+        'hostname': f"network-{i}",
+        'channel': rng.choice([1, 6, 11, 36, 44, 149]),
+        'rssi': rng.randrange(-90, -30),
+        'encryption': rng.choice(['WPA2', 'WPA3', 'OPEN', 'WPA2/WPA3']),
+        'vendor': rng.choice(['Netgear', 'TP-Link', 'Ubiquiti', 'Apple', '']),
+    } for i in range(count)]
+
+
+class StubSession:
+    channel = 6
+
+
+class StubAgent:
+    """Enough of pwnagotchi.agent.Agent for the attributes pwnios reads."""
+
+    def __init__(self, access_points=50, handshakes=20, peers=2):
+        self.mode = 'auto'
+        self.access_points = make_access_points(access_points)
+        self.handshakes = {
+            f"hs{i}": {
+                'filename': f"/home/pi/handshakes/net{i}_aabbccddee{i:02x}.pcap",
+                'access_point': f"network-{i}",
+                'client_station': f"11:22:33:44:55:{i:02x}",
+                'timestamp': time.time(),
+            } for i in range(handshakes)
+        }
+        self.peers = {f"peer{i}": {'peer': f"peer{i}", 'timestamp': time.time()} for i in range(peers)}
+        self._view = {'face': '/etc/pwnagotchi/faces/HAPPY.png', 'status': 'Looking around...'}
+
+    def session(self):
+        return StubSession()
+
+    def view(self):
+        return self._view
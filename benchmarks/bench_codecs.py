@@ -0,0 +1,52 @@
+"""Encode/decode cost and size per message type for each pwnios codec.
+
+Runs offline against stubbed pwnagotchi modules:
+
+    python benchmarks/bench_codecs.py [--iterations 2000] [--clients 4]
+
+Codecs whose backend isn't installed (orjson/ujson, msgpack, cbor2) are skipped;
+stdlib json is always measured as the baseline. The broadcast column is the
+encode cost of one broadcast to --clients clients of that codec, before
+(encode per client) and after (encode once per codec).
+"""
+import argparse
+import time
+
+from _messages import sample_messages
+from _stubs import import_pwnios
+
+pwnios = import_pwnios()
+
+
+def per_call_us(fn, arg, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=4)
+    args = parser.parse_args()
+
+    messages, _, _, _ = sample_messages(pwnios)
+    codecs = [('json (stdlib)', pwnios._JsonCodec(fast=False))]
+    codecs += [(f"{codec.name} ({codec.backend})", codec) for codec in pwnios._available_codecs()
+               if codec.backend != 'json']
+
+    for label, codec in codecs:
+        print(f"\n{label}")
+        print(f"{'message':<20}{'bytes':>8}{'enc us':>9}{'dec us':>9}{'bcast before':>14}{'after':>8}")
+        for name, message in messages.items():
+            payload = codec.encode(message)
+            # Small messages need more iterations for a stable number; big ones fewer
+            iterations = max(50, args.iterations * 200 // max(200, len(payload)))
+            enc = per_call_us(codec.encode, message, iterations)
+            dec = per_call_us(codec.decode, payload, iterations)
+            print(f"{name:<20}{len(payload):>8}{enc:>9.1f}{dec:>9.1f}{enc * args.clients:>14.1f}{enc:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Bytes on the wire and CPU per message for pwnios messages, with and without permessage-deflate.
+
+Runs offline against stubbed pwnagotchi modules:
+
+    python benchmarks/bench_compression.py [--threshold 256] [--window-bits 11] [--mem-level 4]
+
+"cold" is a message compressed by a fresh deflate context (first message on a
+connection, or no_context_takeover); "warm" is the same message sent on a
+connection whose deflate window already holds one of every other message type,
+closer to steady state. Wire sizes include the WebSocket frame header.
+"""
+import argparse
+import json
+import time
+import zlib
+
+from _messages import sample_messages
+from _stubs import import_pwnios
+
+pwnios = import_pwnios()
+
+
+def build_messages():
+    messages, png, face, status = sample_messages(pwnios)
+    encoded = {name: json.dumps(message).encode('utf-8') for name, message in messages.items()}
+    binary = {'face_image_binary': pwnios._pack_binary_frame(
+        pwnios.FRAME_TYPE_FACE_IMAGE, {"face": face, "status": status, "timestamp": time.time()}, png)}
+    return encoded, binary
+
+
+def frame_size(payload_len):
+    if payload_len < 126:
+        return payload_len + 2
+    if payload_len < 65536:
+        return payload_len + 4
+    return payload_len + 10
+
+
+def deflate(compressor, payload):
+    # Same framing as permessage-deflate: sync flush, trailing 00 00 ff ff stripped
+    return (compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+
+def measure(payload, others, args):
+    def compressor():
+        return zlib.compressobj(wbits=-args.window_bits, memLevel=args.mem_level)
+
+    cold = len(deflate(compressor(), payload))
+    warm_ctx = compressor()
+    for other in others:
+        deflate(warm_ctx, other)
+    warm = len(deflate(warm_ctx, payload))
+
+    ctx = compressor()
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        deflate(ctx, payload)
+    us = (time.perf_counter() - started) / args.iterations * 1e6
+    return cold, warm, us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threshold', type=int, default=256)
+    parser.add_argument('--window-bits', type=int, default=11)
+    parser.add_argument('--mem-level', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    messages, binary = build_messages()
+    print(f"window_bits={args.window_bits} mem_level={args.mem_level} threshold={args.threshold}B "
+          f"(face image frames are never compressed)\n")
+    print(f"{'message':<20}{'raw':>8}{'cold':>8}{'warm':>8}{'wire':>8}{'saved':>8}{'us/msg':>9}")
+
+    total_raw = total_wire = 0
+    everything = {**messages, **binary}
+    for name, payload in everything.items():
+        raw = frame_size(len(payload))
+        cold, warm, us = measure(payload, [p for n, p in messages.items() if n != name], args)
+        skipped = name in binary or len(payload) < args.threshold
+        wire = raw if skipped else frame_size(warm)
+        total_raw += raw
+        total_wire += wire
+        print(f"{name:<20}{raw:>8}{frame_size(cold):>8}{frame_size(warm):>8}{wire:>8}"
+              f"{(1 - wire / raw) * 100:>7.0f}%{'-' if skipped else f'{us:.1f}':>9}")
+
+    print(f"\n{'all of the above':<20}{total_raw:>8}{'':>16}{total_wire:>8}{(1 - total_wire / total_raw) * 100:>7.0f}%")
+
+
+if __name__ == '__main__':
+    main()
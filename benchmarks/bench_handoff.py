@@ -0,0 +1,100 @@
+"""Agent-thread cost of handing one event to the event loop, per handoff strategy.
+
+Runs offline against stubbed pwnagotchi modules:
+
+    python benchmarks/bench_handoff.py [--messages 20000] [--burst 1]
+
+A producer thread (standing in for the agent) hands --messages events to a
+loop running on another thread, in bursts of --burst back-to-back calls:
+
+* run_coroutine_threadsafe: a coroutine + concurrent Future + wakeup per event
+* call_soon_threadsafe: one callback handle + wakeup per event
+* queue_message: the plugin's lock-protected deque, one wakeup per drain
+
+"producer" is time spent in the producer thread per event; "end to end" is
+until the loop has put the last event on the broadcast queue.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from _stubs import import_pwnios
+
+pwnios = import_pwnios()
+
+
+class LoopThread:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.queue = None
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.queue = asyncio.Queue()
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def run_strategy(name, args):
+    runner = LoopThread()
+    queue, loop = runner.queue, runner.loop
+
+    if name == 'run_coroutine_threadsafe':
+        def send(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop)
+    elif name == 'call_soon_threadsafe':
+        def send(message):
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+    else:
+        plugin = pwnios.PwnIOS()
+        plugin.options = {}
+        plugin.loop = loop
+        plugin.message_queue = queue
+        plugin._put_broadcast = queue.put_nowait
+        send = plugin.queue_message
+
+    message = {'type': 'channel_hop', 'data': {'channel': 6}}
+    producer = 0.0
+    started = time.perf_counter()
+    sent = 0
+    while sent < args.messages:
+        burst_started = time.perf_counter()
+        for _ in range(min(args.burst, args.messages - sent)):
+            send(message)
+            sent += 1
+        producer += time.perf_counter() - burst_started
+        if args.gap:
+            time.sleep(args.gap)
+    while queue.qsize() < args.messages:
+        time.sleep(0.0005)
+    end_to_end = time.perf_counter() - started - (args.gap * (args.messages // args.burst))
+    runner.stop()
+    return producer / args.messages * 1e6, end_to_end / args.messages * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--burst', type=int, default=1, help="events handed over back to back")
+    parser.add_argument('--gap', type=float, default=0.0, help="seconds to sleep between bursts")
+    args = parser.parse_args()
+
+    print(f"{args.messages} events in bursts of {args.burst}\n")
+    print(f"{'strategy':<28}{'producer us':>13}{'end to end us':>15}")
+    for name in ('run_coroutine_threadsafe', 'call_soon_threadsafe', 'queue_message'):
+        producer, end_to_end = run_strategy(name, args)
+        print(f"{name:<28}{producer:>13.2f}{end_to_end:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Plugin load latency: module import and on_loaded time as seen by pwnagotchi's plugin loader.
+
+Runs offline against stubbed pwnagotchi modules:
+
+    python benchmarks/bench_startup.py [--runs 10]
+
+Each run is a fresh interpreter so import caches don't flatter the numbers.
+"cold" imports pwnios into an interpreter that has nothing loaded yet;
+"preloaded" first imports asyncio and websockets, the way a device whose
+bettercap client already pulled them in would look. "deferred" is the work
+moved to the server thread (websocket stack import + PiSugar probe), which
+no longer blocks boot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {here!r})
+if {preload!r}:
+    import asyncio, websockets
+from _stubs import install_pwnagotchi_stubs, REPO_ROOT
+install_pwnagotchi_stubs()
+sys.path.insert(0, REPO_ROOT)
+
+started = time.perf_counter()
+import pwnios
+imported = time.perf_counter()
+plugin = pwnios.PwnIOS()
+plugin.options = {{'port': 0}}
+plugin.on_loaded()
+loaded = time.perf_counter()
+while plugin.loop is None:
+    time.sleep(0.001)
+ready = time.perf_counter()
+plugin.on_unload(None)
+print(json.dumps({{
+    'import': (imported - started) * 1000,
+    'on_loaded': (loaded - imported) * 1000,
+    'deferred': (ready - loaded) * 1000,
+}}))
+"""
+
+
+def run(preload):
+    code = CHILD.format(here=HERE, preload=preload)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"median of {args.runs} fresh interpreters, ms\n")
+    print(f"{'':<12}{'import':>10}{'on_loaded':>12}{'boot total':>12}{'deferred':>10}")
+    for label, preload in (('cold', False), ('preloaded', True)):
+        samples = [run(preload) for _ in range(args.runs)]
+        median = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+        print(f"{label:<12}{median['import']:>10.1f}{median['on_loaded']:>12.1f}"
+              f"{median['import'] + median['on_loaded']:>12.1f}{median['deferred']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""Load test: many simulated iOS clients against a PwnIOS server driven by a stub agent.
+
+Everything runs offline on localhost against stubbed pwnagotchi modules:
+
+    python benchmarks/load_test.py --clients 20 --duration 30 --handshake-rate 2 --wifi-rate 5
+
+Each client polls get_stats / get_face_image / get_access_points at the given
+per-client rates, while a driver thread plays the agent and fires on_handshake,
+on_wifi_update and on_channel_hop at the given rates. Reported:
+
+* throughput of messages received by all clients
+* request round trip (request -> acknowledgment) p50/p99
+* handshake delivery latency (on_handshake call -> client receive) p50/p99
+* resident memory and Python heap growth over the run
+
+--max-p99-ms makes the run exit non-zero when handshake delivery or request
+p99 exceeds the budget, so it can gate a deployment.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from _messages import fake_png
+from _stubs import StubAgent, import_pwnios, make_access_points
+
+pwnios = import_pwnios()
+import websockets  # noqa: E402  (after the stubs so import order matches the plugin)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class StubUI:
+    def set(self, key, value):
+        pass
+
+
+class AgentDriver(threading.Thread):
+    """Plays the pwnagotchi agent thread: fires plugin callbacks at fixed rates."""
+
+    def __init__(self, plugin, agent, args, handshake_sent):
+        super().__init__(daemon=True)
+        self.plugin = plugin
+        self.agent = agent
+        self.args = args
+        self.handshake_sent = handshake_sent
+        self.stop_event = threading.Event()
+        self.callback_seconds = 0.0
+        self.callbacks = 0
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        fn(*args)
+        self.callback_seconds += time.perf_counter() - started
+        self.callbacks += 1
+
+    def run(self):
+        rng = random.Random(1)
+        schedule = {
+            'handshake': self.args.handshake_rate,
+            'wifi': self.args.wifi_rate,
+            'hop': self.args.hop_rate,
+            'ui': self.args.ui_rate,
+        }
+        next_at = {name: time.perf_counter() for name, rate in schedule.items() if rate > 0}
+        counter = itertools.count()
+        faces = ['HAPPY', 'SAD', 'COOL']
+        scan = make_access_points(self.args.access_points, seed=2)
+
+        while not self.stop_event.is_set() and next_at:
+            name = min(next_at, key=next_at.get)
+            delay = next_at[name] - time.perf_counter()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            next_at[name] += 1.0 / schedule[name]
+
+            if name == 'handshake':
+                n = next(counter)
+                filename = f"/tmp/loadtest_{n}.pcap"
+                self.handshake_sent[filename] = time.perf_counter()
+                self._timed(self.plugin.on_handshake, self.agent, filename, 'aa:bb:cc:dd:ee:ff', '11:22:33:44:55:66')
+            elif name == 'wifi':
+                for ap in rng.sample(scan, k=max(1, len(scan) // 10)):
+                    ap['rssi'] = rng.randrange(-90, -30)
+                self._timed(self.plugin.on_wifi_update, self.agent, scan)
+            elif name == 'hop':
+                self._timed(self.plugin.on_channel_hop, self.agent, rng.choice([1, 6, 11]))
+            elif name == 'ui':
+                self.agent._view['face'] = f"/etc/pwnagotchi/faces/{rng.choice(faces)}.png"
+                self._timed(self.plugin.on_ui_update, StubUI())
+
+
+class SimulatedClient:
+    def __init__(self, index, args, handshake_sent, results):
+        self.index = index
+        self.args = args
+        self.handshake_sent = handshake_sent
+        self.results = results
+        self.pending = {}
+
+    async def run(self, deadline, connected):
+        url = f"ws://127.0.0.1:{self.args.port}/"
+        async with websockets.connect(url, max_size=2 ** 22) as ws:
+            connected.release()
+            reader = asyncio.create_task(self._reader(ws))
+            pollers = [
+                asyncio.create_task(self._poll(ws, msg_type, rate, deadline))
+                for msg_type, rate in (
+                    ('get_stats', self.args.stats_rate),
+                    ('get_face_image', self.args.face_rate),
+                    ('get_access_points', self.args.ap_rate),
+                ) if rate > 0
+            ]
+            await asyncio.gather(*pollers)
+            await asyncio.sleep(0.5)  # let in-flight broadcasts arrive
+            reader.cancel()
+
+    async def _poll(self, ws, msg_type, rate, deadline):
+        # Stagger clients so polls don't all land on the same tick
+        next_at = time.perf_counter() + random.random() / rate
+        ids = itertools.count()
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            next_at += 1.0 / rate
+            message_id = f"{self.index}-{msg_type}-{next(ids)}"
+            self.pending[message_id] = time.perf_counter()
+            await ws.send(json.dumps({'type': msg_type, 'message_id': message_id}))
+
+    async def _reader(self, ws):
+        async for raw in ws:
+            now = time.perf_counter()
+            self.results['received'] += 1
+            self.results['bytes'] += len(raw)
+            if isinstance(raw, bytes):
+                continue
+            message = json.loads(raw)
+            msg_type = message.get('type')
+            if msg_type == 'acknowledgment':
+                sent = self.pending.pop(message.get('message_id'), None)
+                if sent is not None:
+                    self.results['rtt'].append((now - sent) * 1000)
+            elif msg_type == 'handshake':
+                sent = self.handshake_sent.get(message['data']['filename'])
+                if sent is not None:
+                    self.results['handshake_latency'].append((now - sent) * 1000)
+
+
+async def run_clients(args, driver, handshake_sent, results):
+    # Connect everyone before the agent starts firing so every client should see every handshake
+    connected = asyncio.Semaphore(0)
+    deadline = time.perf_counter() + args.duration
+    clients = [SimulatedClient(i, args, handshake_sent, results) for i in range(args.clients)]
+    tasks = [asyncio.create_task(client.run(deadline, connected)) for client in clients]
+    for _ in clients:
+        await connected.acquire()
+    driver.start()
+    await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+    driver.stop_event.set()
+    await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--port', type=int, default=18082)
+    parser.add_argument('--stats-rate', type=float, default=1.0, help="get_stats per client per second")
+    parser.add_argument('--face-rate', type=float, default=0.2, help="get_face_image per client per second")
+    parser.add_argument('--ap-rate', type=float, default=0.1, help="get_access_points per client per second")
+    parser.add_argument('--handshake-rate', type=float, default=1.0, help="on_handshake calls per second")
+    parser.add_argument('--wifi-rate', type=float, default=2.0, help="on_wifi_update calls per second")
+    parser.add_argument('--hop-rate', type=float, default=5.0, help="on_channel_hop calls per second")
+    parser.add_argument('--ui-rate', type=float, default=1.0, help="on_ui_update calls per second")
+    parser.add_argument('--access-points', type=int, default=100, help="APs in each simulated scan")
+    parser.add_argument('--max-p99-ms', type=float, default=0.0, help="fail if a p99 exceeds this (0 = report only)")
+    args = parser.parse_args()
+
+    faces_dir = tempfile.mkdtemp(prefix='pwnios-faces-')
+    png = fake_png()
+    for face in ('HAPPY', 'SAD', 'COOL'):
+        with open(os.path.join(faces_dir, f"{face}.png"), 'wb') as f:
+            f.write(png)
+
+    tracemalloc.start()
+    rss_before = rss_kb()
+
+    plugin = pwnios.PwnIOS()
+    plugin.options = {'port': args.port}
+    plugin.on_loaded()
+    plugin.face_cache = pwnios._FaceImageCache(base_paths=[faces_dir])
+    agent = StubAgent(access_points=args.access_points)
+    plugin.on_ready(agent)
+    while not (plugin.loop and plugin.loop.is_running() and plugin.websocket_server):
+        time.sleep(0.05)
+
+    handshake_sent = {}
+    results = {'received': 0, 'bytes': 0, 'rtt': [], 'handshake_latency': []}
+    driver = AgentDriver(plugin, agent, args, handshake_sent)
+    heap_before = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(run_clients(args, driver, handshake_sent, results))
+    finally:
+        driver.stop_event.set()
+        if driver.is_alive():
+            driver.join()
+    elapsed = time.perf_counter() - started
+
+    heap_after = tracemalloc.get_traced_memory()[0]
+    rss_after = rss_kb()
+    plugin.on_unload(None)
+    plugin.server_thread.join(timeout=5)  # let the server loop finish closing connections before exiting
+    shutil.rmtree(faces_dir, ignore_errors=True)
+
+    rtt, hs = results['rtt'], results['handshake_latency']
+    expected_handshakes = len(handshake_sent) * args.clients
+    print(f"clients={args.clients} duration={elapsed:.1f}s")
+    print(f"throughput        {results['received'] / elapsed:10.1f} msg/s  {results['bytes'] / elapsed / 1024:10.1f} KiB/s")
+    print(f"request rtt       p50={percentile(rtt, 50):7.2f}ms  p99={percentile(rtt, 99):7.2f}ms  n={len(rtt)}")
+    print(f"handshake deliver p50={percentile(hs, 50):7.2f}ms  p99={percentile(hs, 99):7.2f}ms  "
+          f"n={len(hs)}/{expected_handshakes}")
+    print(f"agent callbacks   {driver.callbacks} calls, avg {driver.callback_seconds / max(1, driver.callbacks) * 1e6:.0f}us on the agent thread")
+    print(f"memory            rss {rss_before} -> {rss_after} KiB, python heap +{(heap_after - heap_before) / 1024:.0f} KiB")
+
+    if args.max_p99_ms and max(percentile(rtt, 99), percentile(hs, 99)) > args.max_p99_ms:
+        print(f"FAIL: p99 above {args.max_p99_ms}ms")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,34 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import json
 import logging
-import asyncio
-import websockets
 import threading
-import base64
+import binascii
 import os
 import pwnagotchi
 from datetime import datetime
-import time
 import importlib.util
 import sys
+import struct
+import math
+import mmap
+import fnmatch
+from urllib.parse import urlparse, parse_qs
+from collections import OrderedDict, deque
 
 import pwnagotchi.plugins as plugins
-import pwnagotchi.ui.fonts as fonts
-from pwnagotchi.ui.components import LabeledValue
-from pwnagotchi.ui.view import BLACK
+
+# asyncio and websockets are bound by _import_network_stack() on the server thread,
+# so loading the plugin doesn't pay for them during pwnagotchi boot.
+asyncio = None
+websockets = None
+
+
+def _import_network_stack():
+    global asyncio, websockets
+    import asyncio
+    import websockets
 
 # Configuration values
 # /etc/pwnagotchi/config.toml
@@ -32,9 +46,47 @@ from pwnagotchi.ui.view import BLACK
 ### OPTIONAL ###
 ## PiSugar ##
 # main.plugins.pwnios.pisugar = true  # Enable PiSugar battery monitoring
+# main.plugins.pwnios.sensor_interval = 10  # Seconds between temperature/battery samples
+# main.plugins.pwnios.sensor_history = 30  # Samples kept for get_sensor_history
+# main.plugins.pwnios.battery_max_backoff = 600  # Max seconds between retries while the PiSugar is missing
 ## GPS ##
 # main.plugins.pwnios.save_gps_log = false  # Enable GPS logging to file
 # main.plugins.pwnios.gps_log_path = /path/to/gps.log # /tmp/pwnagotchi_gps.log is set by default
+# main.plugins.pwnios.gps_log_format = "json"  # "json" lines, or "binary" fixed-width records queryable with get_gps_track
+# main.plugins.pwnios.gps_log_flush_size = 20  # Buffered fixes that trigger a write
+# main.plugins.pwnios.gps_log_flush_interval = 5  # Max seconds a fix stays buffered
+# main.plugins.pwnios.gps_log_max_bytes = 5242880  # Rotate the log past this size (0 disables)
+# main.plugins.pwnios.gps_log_max_age = 0  # Rotate the log after this many seconds (0 disables)
+# main.plugins.pwnios.gps_log_backups = 3  # Rotated logs to keep (gps.log.1 ... gps.log.N)
+# main.plugins.pwnios.gps_log_fsync = "rotate"  # "flush", "rotate" (rotation/shutdown only) or "never"
+# main.plugins.pwnios.gps_min_distance = 5  # Metres a fix must move from the last kept one to be stored/broadcast (0 keeps all)
+# main.plugins.pwnios.gps_max_interval = 30  # Seconds after which a fix is kept even without movement
+# main.plugins.pwnios.gps_max_accuracy = 0  # Drop fixes less accurate than this many metres (0 disables)
+## Performance ##
+# main.plugins.pwnios.face_cache_size = 32  # Max face images kept encoded in memory
+# main.plugins.pwnios.client_queue_size = 64  # Max pending broadcasts per client
+# main.plugins.pwnios.client_send_timeout = 5  # Seconds before a stalled send drops the client
+# main.plugins.pwnios.client_evict_after = 10  # Seconds a client may stay saturated before eviction
+# main.plugins.pwnios.broadcast_queue_size = 256  # Max events waiting for the broadcaster
+# main.plugins.pwnios.stats_ttl = 2.0  # Seconds a stats snapshot is shared before rebuilding
+# main.plugins.pwnios.event_coalesce_window = 0.5  # Seconds to merge channel_hop/wifi_update bursts (0 disables)
+# main.plugins.pwnios.request_coalesce_window = 0  # Seconds a finished get_face_image/get_access_points reply is reused (0 = share in-flight only)
+# main.plugins.pwnios.blocking_workers = 2  # Threads for agent/file work kept off the event loop
+# main.plugins.pwnios.blocking_queue_size = 16  # Max blocking jobs queued or running before requests wait
+# main.plugins.pwnios.loop_lag_warn_ms = 100  # Warn when the event loop is blocked longer than this (0 disables)
+# main.plugins.pwnios.replay_buffer_size = 256  # Recent non-coalescible broadcasts (handshakes, deltas) kept for resuming clients
+# main.plugins.pwnios.metrics_log_interval = 0  # Seconds between metrics summary log lines (0 disables)
+# main.plugins.pwnios.compression = true  # Offer permessage-deflate to clients that support it
+# main.plugins.pwnios.compression_threshold = 256  # Messages smaller than this (bytes) are sent uncompressed; face image frames never are
+# main.plugins.pwnios.compression_window_bits = 11  # Deflate window, 9-15 (lower uses less RAM per client)
+# main.plugins.pwnios.compression_mem_level = 4  # zlib memLevel, 1-9 (lower uses less RAM per client)
+# main.plugins.pwnios.handshake_queue_size = 64  # Max handshake GPS sidecars waiting to be written
+# main.plugins.pwnios.sidecar_flush_interval = 0.5  # Seconds to batch sidecar writes after a capture
+# main.plugins.pwnios.handshake_budget_ms = 2.0  # Warn when on_handshake holds the agent thread longer (0 disables)
+# main.plugins.pwnios.handshakes_dir = "/root/handshakes"  # Where pcaps and their .gps.json sidecars live
+# main.plugins.pwnios.handshake_index_path = ""  # Saved map index (default: <handshakes_dir>/.pwnios_index.json)
+# main.plugins.pwnios.handshake_index_cell = 0.01  # Index bucket size in degrees (~1km)
+# main.plugins.pwnios.handshake_bbox_max_points = 500  # get_handshakes_in_bbox clusters above this many results
 
 
 # Use MockPiSugarModule initially or else PiSugar import errors will occur at startup
@@ -55,6 +107,1565 @@ class _MockPiSugarModule:
 
 PISUGAR_AVAILABLE = False
 
+FACE_BASE_PATHS = ["/custom-faces", "/etc/pwnagotchi/faces", "/home/pi/custom-faces"]
+
+# Binary frames (opt-in via set_capabilities) carry raw payloads instead of base64-in-JSON.
+# Layout, big-endian: magic "PW", version u8, frame type u8, metadata length u16,
+# UTF-8 JSON metadata, then the raw payload bytes.
+BINARY_FRAME_MAGIC = b"PW"
+BINARY_FRAME_VERSION = 1
+FRAME_TYPE_FACE_IMAGE = 1
+_FRAME_HEADER = struct.Struct(">2sBBH")
+
+
+def _pack_binary_frame(frame_type, metadata, payload):
+    meta = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+    return _FRAME_HEADER.pack(BINARY_FRAME_MAGIC, BINARY_FRAME_VERSION, frame_type, len(meta)) + meta + payload
+
+
+# Optional protocol features a client can turn on with set_capabilities
+SUPPORTED_CAPABILITIES = ('binary_images', 'stats_delta', 'ap_delta', 'gps_full_rate')
+
+
+# How a client's outbox treats a message type when it is backed up:
+# coalesce keeps only the newest pending message of that type, never_drop is
+# always delivered, anything else may be shed oldest-first once the queue is full.
+POLICY_COALESCE = 'coalesce'
+POLICY_NEVER_DROP = 'never_drop'
+POLICY_DROP_OLDEST = 'drop_oldest'
+
+MESSAGE_POLICIES = {
+    'stats': POLICY_COALESCE,
+    'channel_hop': POLICY_COALESCE,
+    'wifi_update': POLICY_COALESCE,
+    'gps_update': POLICY_COALESCE,
+    'face_image': POLICY_COALESCE,
+    'keepalive': POLICY_COALESCE,
+    'handshake': POLICY_NEVER_DROP,
+    'peer_detected': POLICY_NEVER_DROP,
+}
+
+
+class _ClientOutbox:
+    """Bounded outbound queue for one connection, drained by its own writer task.
+
+    Broadcasts only ever append here, so a client stalled on flaky Wi-Fi backs up
+    its own queue instead of holding up everyone else. `on_evict` is called once
+    when the client has to be dropped (send failure, timeout, or staying saturated
+    for longer than `evict_after` seconds). Pinned items (a session replay) sit
+    outside the bound and are never shed.
+    """
+
+    def __init__(self, websocket, on_evict, max_size=64, send_timeout=5.0, evict_after=10.0, metrics=None):
+        self.websocket = websocket
+        self.metrics = metrics
+        self.on_evict = on_evict
+        self.max_size = max(1, int(max_size))
+        self.send_timeout = send_timeout
+        self.evict_after = evict_after
+        self._pending = deque()  # [msg_type, payload] or [msg_type, payload, True] when pinned
+        self._latest = {}  # msg_type -> pending item, for coalescing types
+        self._pinned = 0
+        self._wakeup = asyncio.Event()
+        self.saturated_since = None
+        self.task = None
+        self.evicted = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task and not self.task.done() and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, msg_type, payload, pinned=False):
+        if self.evicted:
+            return
+
+        if pinned:
+            self._pending.append([msg_type, payload, True])
+            self._pinned += 1
+            self._wakeup.set()
+            return
+
+        policy = MESSAGE_POLICIES.get(msg_type, POLICY_DROP_OLDEST)
+        if policy == POLICY_COALESCE:
+            item = self._latest.get(msg_type)
+            if item is not None:
+                item[1] = payload
+                self.coalesced += 1
+                if self.metrics:
+                    self.metrics.incr('client.coalesced')
+                return
+
+        item = [msg_type, payload]
+        self._pending.append(item)
+        if policy == POLICY_COALESCE:
+            self._latest[msg_type] = item
+
+        if len(self._pending) - self._pinned > self.max_size:
+            self._shed()
+            if self.saturated_since is None:
+                self.saturated_since = time.time()
+            elif time.time() - self.saturated_since > self.evict_after:
+                self._evict(f"queue saturated for over {self.evict_after}s")
+                return
+
+        self._wakeup.set()
+
+    def _shed(self):
+        for item in self._pending:
+            if len(item) == 2 and MESSAGE_POLICIES.get(item[0]) != POLICY_NEVER_DROP:
+                self._pending.remove(item)
+                self._forget_latest(item)
+                self.dropped += 1
+                if self.metrics:
+                    self.metrics.incr('client.dropped')
+                return
+
+    def _forget_latest(self, item):
+        if self._latest.get(item[0]) is item:
+            del self._latest[item[0]]
+
+    def _evict(self, reason):
+        if self.evicted:
+            return
+        self.evicted = True
+        if self.metrics:
+            self.metrics.incr('client.evicted')
+        self._pending.clear()
+        self._latest.clear()
+        self._pinned = 0
+        logging.warning(f"[PwnIOS] Evicting client {self.websocket.remote_address}: {reason}")
+        self.on_evict(self.websocket)
+
+    async def _run(self):
+        while not self.evicted:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            item = self._pending.popleft()
+            if len(item) > 2:
+                self._pinned -= 1
+            self._forget_latest(item)
+            if len(self._pending) - self._pinned <= self.max_size // 2:
+                self.saturated_since = None
+
+            try:
+                started = time.perf_counter()
+                await asyncio.wait_for(self.websocket.send(item[1]), timeout=self.send_timeout)
+                self.sent += 1
+                if self.metrics:
+                    self.metrics.observe('client.send', (time.perf_counter() - started) * 1000)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._evict(f"send timed out after {self.send_timeout}s")
+            except Exception as e:
+                self._evict(f"send error: {e}")
+
+
+class _RotatingLogWriter:
+    """Buffers records in memory and appends them from a background thread.
+
+    A flush happens once `flush_size` records are buffered or `flush_interval`
+    seconds have passed, so the file is written in batches rather than per record
+    and never from the event loop. The file is rotated to path.1 ... path.N once it
+    exceeds `max_bytes` or has been open for `max_age` seconds. `fsync` is one of
+    "flush", "rotate" or "never".
+    """
+
+    def __init__(self, path, flush_size=20, flush_interval=5.0, max_bytes=5 * 1024 * 1024,
+                 max_age=0, backups=3, fsync="rotate"):
+        self.path = path
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = max(1, int(backups))
+        self.fsync = fsync
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._file = None
+        self._opened_at = 0.0
+        self.records_written = 0
+        self.flushes = 0
+        self.rotations = 0
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def close(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+        self._flush()
+        self._close_file(sync=self.fsync != "never")
+
+    def _flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, []
+
+        try:
+            self._maybe_rotate()
+            if self._file is None:
+                self._open_file()
+            self._file.write(b''.join(records))
+            self._file.flush()
+            if self.fsync == "flush":
+                os.fsync(self._file.fileno())
+            self.records_written += len(records)
+            self.flushes += 1
+        except Exception as e:
+            logging.error(f"[PwnIOS] Log write error ({self.path}): {e}")
+            self._close_file(sync=False)
+
+    def _open_file(self):
+        self._file = open(self.path, 'ab')
+        self._opened_at = time.time()
+
+    def _close_file(self, sync):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        except Exception as e:
+            logging.error(f"[PwnIOS] Log close error ({self.path}): {e}")
+        self._file = None
+
+    def _maybe_rotate(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        too_big = self.max_bytes and size >= self.max_bytes
+        too_old = self.max_age and self._file is not None and time.time() - self._opened_at >= self.max_age
+        if not (too_big or too_old):
+            return
+
+        self._close_file(sync=self.fsync != "never")
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+        logging.info(f"[PwnIOS] Rotated log {self.path} ({size} bytes)")
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            'path': self.path,
+            'buffered': buffered,
+            'records_written': self.records_written,
+            'flushes': self.flushes,
+            'rotations': self.rotations,
+        }
+
+
+class _SidecarWriter:
+    """Writes handshake .gps.json sidecars from a background thread.
+
+    Jobs are accepted up to `max_pending`; beyond that `submit` returns False
+    rather than blocking the agent. Each wake-up drains everything pending, so a
+    burst of captures is written as one batch: every sidecar goes to a temp file,
+    is fsynced and renamed over the target, then each directory is synced once.
+    `on_written` is called with the list of (path, record) that made it to disk.
+    """
+
+    def __init__(self, max_pending=64, flush_interval=0.5, metrics=None, on_written=None):
+        self.max_pending = max(1, int(max_pending))
+        self.flush_interval = flush_interval
+        self.metrics = metrics
+        self.on_written = on_written
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def submit(self, path, record):
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append((path, record))
+        self._wakeup.set()
+        return True
+
+    def close(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait()
+            # Give the rest of a capture burst a moment to queue up behind the first one
+            self._stop_event.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+
+        started = time.perf_counter()
+        directories = set()
+        written = []
+        for path, record in batch:
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w') as fp:
+                    json.dump(record, fp)
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                os.replace(tmp_path, path)
+                directories.add(os.path.dirname(path) or '.')
+                written.append((path, record))
+                self.written += 1
+                logging.debug(f"[PwnIOS] Saved GPS to {path} ({record})")
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"[PwnIOS] Error saving GPS data to {path}: {e}")
+                try: os.unlink(tmp_path)
+                except OSError: pass
+
+        # The renames are only durable once the directory entries are
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+                try: os.fsync(fd)
+                finally: os.close(fd)
+            except OSError:
+                pass
+
+        self.batches += 1
+        if self.metrics:
+            self.metrics.observe('sidecar.batch', (time.perf_counter() - started) * 1000)
+        logging.info(f"[PwnIOS] Saved GPS sidecars for {len(batch)} handshake(s)")
+
+        if written and self.on_written:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                logging.error(f"[PwnIOS] Sidecar callback error: {e}")
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'batches': self.batches,
+        }
+
+
+# Binary GPS track record: epoch seconds (f64), latitude (f64), longitude (f64), accuracy (f32)
+GPS_TRACK_RECORD = struct.Struct('<dddf')
+GPS_LOG_DEFAULT_PATHS = {
+    'json': '/tmp/pwnagotchi_gps.log',
+    'binary': '/tmp/pwnagotchi_gps.bin',
+}
+
+
+class _GPSTrackReader:
+    """Time-range queries over binary GPS track files written by _RotatingLogWriter.
+
+    Each file (oldest rotation first, live file last) is memory-mapped and searched
+    with a binary search on the timestamp column, so a range lookup touches only the
+    records it returns. Records are assumed to be appended in time order.
+    """
+
+    def __init__(self, path, backups=3):
+        self.path = path
+        self.backups = backups
+
+    def _files(self):
+        candidates = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        return [p for p in candidates if os.path.isfile(p)]
+
+    @staticmethod
+    def _lower_bound(mm, count, ts):
+        lo, hi = 0, count
+        size = GPS_TRACK_RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from('<d', mm, mid * size)[0] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def _upper_bound(mm, count, ts):
+        lo, hi = 0, count
+        size = GPS_TRACK_RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from('<d', mm, mid * size)[0] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, start=None, end=None):
+        """Returns [[timestamp, latitude, longitude, accuracy], ...] with start <= timestamp <= end."""
+        start = float('-inf') if start is None else float(start)
+        end = float('inf') if end is None else float(end)
+        size = GPS_TRACK_RECORD.size
+        points = []
+
+        for path in self._files():
+            try:
+                with open(path, 'rb') as f:
+                    # Ignore a trailing partial record from a write in progress
+                    count = os.fstat(f.fileno()).st_size // size
+                    if count == 0:
+                        continue
+                    with mmap.mmap(f.fileno(), count * size, access=mmap.ACCESS_READ) as mm:
+                        if GPS_TRACK_RECORD.unpack_from(mm, (count - 1) * size)[0] < start:
+                            continue
+                        if GPS_TRACK_RECORD.unpack_from(mm, 0)[0] > end:
+                            continue
+                        first = self._lower_bound(mm, count, start)
+                        last = self._upper_bound(mm, count, end)
+                        for i in range(first, last):
+                            ts, lat, lon, acc = GPS_TRACK_RECORD.unpack_from(mm, i * size)
+                            points.append([ts, lat, lon, round(acc, 2)])
+            except (OSError, ValueError) as e:
+                logging.error(f"[PwnIOS] GPS track read error ({path}): {e}")
+
+        return points
+
+    @staticmethod
+    def decimate(points, max_points):
+        """Evenly thins `points` to at most `max_points`, always keeping the last one."""
+        if not max_points or max_points <= 0 or len(points) <= max_points:
+            return points
+        if max_points == 1:
+            return [points[-1]]
+        step = (len(points) - 1) / (max_points - 1)
+        return [points[round(i * step)] for i in range(max_points)]
+
+
+class _GPSFixFilter:
+    """Decides which phone GPS fixes are worth storing and broadcasting.
+
+    A fix is accepted when it is at least `min_distance` metres from the last
+    accepted one, when `max_interval` seconds have passed since then, or when its
+    accuracy is less than half the last accepted accuracy. Fixes worse than
+    `max_accuracy` metres are dropped outright (0 disables that check), and a
+    `min_distance` of 0 accepts everything.
+    """
+
+    EARTH_RADIUS_M = 6371000.0
+
+    def __init__(self, min_distance=5.0, max_interval=30.0, max_accuracy=0.0):
+        self.min_distance = float(min_distance or 0)
+        self.max_interval = float(max_interval or 0)
+        self.max_accuracy = float(max_accuracy or 0)
+        self._last = None  # (monotonic time, latitude, longitude, accuracy)
+        self.accepted = 0
+        self.dropped = {'distance': 0, 'accuracy': 0}
+
+    @classmethod
+    def distance(cls, lat1, lon1, lat2, lon2):
+        # Equirectangular approximation: well within GPS error at the distances that matter here
+        x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+        y = math.radians(lat2 - lat1)
+        return math.hypot(x, y) * cls.EARTH_RADIUS_M
+
+    def offer(self, latitude, longitude, accuracy, now=None):
+        """Returns None if the fix is accepted, otherwise the reason it was dropped."""
+        now = time.monotonic() if now is None else now
+        accuracy = float(accuracy) if accuracy is not None else None
+
+        if self.max_accuracy and accuracy is not None and accuracy > self.max_accuracy:
+            self.dropped['accuracy'] += 1
+            return 'accuracy'
+
+        last = self._last
+        if last is not None and self.min_distance:
+            last_time, last_lat, last_lon, last_accuracy = last
+            stale = self.max_interval and now - last_time >= self.max_interval
+            improved = accuracy is not None and last_accuracy is not None and accuracy < last_accuracy / 2
+            if not stale and not improved and \
+                    self.distance(last_lat, last_lon, latitude, longitude) < self.min_distance:
+                self.dropped['distance'] += 1
+                return 'distance'
+
+        self._last = (now, latitude, longitude, accuracy)
+        self.accepted += 1
+        return None
+
+    def reset(self):
+        """Forgets the last accepted fix, so the next one is accepted whatever its distance."""
+        self._last = None
+
+    def stats(self):
+        return {
+            'accepted': self.accepted,
+            'dropped': dict(self.dropped),
+            'min_distance': self.min_distance,
+            'max_interval': self.max_interval,
+            'max_accuracy': self.max_accuracy,
+        }
+
+
+def _read_sidecar(path):
+    """(latitude, longitude, accuracy, timestamp) from a .gps.json sidecar, or None."""
+    with open(path) as fp:
+        return _read_sidecar_record(json.load(fp))
+
+
+def _read_sidecar_record(data):
+    # Other GPS plugins write the same file with different key casing
+    data = {str(key).lower(): value for key, value in data.items()}
+    try:
+        latitude, longitude = float(data['latitude']), float(data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not latitude and not longitude:
+        return None
+    try:
+        accuracy = float(data.get('accuracy') or 0)
+    except (TypeError, ValueError):
+        accuracy = 0.0
+    return latitude, longitude, accuracy, data.get('timestamp') or data.get('updated')
+
+
+class _HandshakeIndex:
+    """Grid-bucketed spatial index of handshakes that have a .gps.json sidecar.
+
+    Points are bucketed into `cell` degree squares so a bounding-box query only
+    visits the buckets it overlaps. The index is saved to `path` and `rebuild()`
+    rescans the handshake directory, parsing only sidecars that are new or whose
+    mtime changed since the last save.
+    """
+
+    FIELDS = ("latitude", "longitude", "accuracy", "timestamp", "filename")
+    CLUSTER_FIELDS = ("latitude", "longitude", "count")
+    VERSION = 1
+
+    def __init__(self, path, handshake_dir, cell=0.01):
+        self.path = path
+        self.handshake_dir = handshake_dir
+        self.cell = float(cell)
+        self._entries = {}  # sidecar name -> (mtime_ns, lat, lon, accuracy, timestamp)
+        self._buckets = {}  # (row, col) -> {sidecar name: point tuple}
+        self._lock = threading.Lock()
+        # rebuild() and sidecar indexing save from different threads; one writer at a time
+        self._save_lock = threading.Lock()
+        self.ready = False
+        self.parsed = 0
+
+    def _bucket(self, latitude, longitude):
+        return int(latitude // self.cell), int(longitude // self.cell)
+
+    def _insert(self, name, entry):
+        self._remove(name)
+        _, latitude, longitude, accuracy, timestamp = entry
+        self._entries[name] = entry
+        filename = os.path.join(self.handshake_dir, name[:-len('.gps.json')] + '.pcap')
+        self._buckets.setdefault(self._bucket(latitude, longitude), {})[name] = (
+            latitude, longitude, accuracy, timestamp, filename)
+
+    def _remove(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        key = self._bucket(entry[1], entry[2])
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(name, None)
+            if not bucket:
+                del self._buckets[key]
+
+    def rebuild(self):
+        """Loads the saved index and reconciles it with the sidecars on disk."""
+        started = time.perf_counter()
+        saved = {}
+        try:
+            with open(self.path) as fp:
+                stored = json.load(fp)
+            if stored.get('version') == self.VERSION and stored.get('cell') == self.cell:
+                saved = {name: tuple(entry) for name, entry in stored.get('entries', {}).items()}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"[PwnIOS] Ignoring unreadable handshake index {self.path}: {e}")
+
+        entries = {}
+        parsed = 0
+        try:
+            with os.scandir(self.handshake_dir) as it:
+                for dirent in it:
+                    if not dirent.name.endswith('.gps.json'):
+                        continue
+                    try:
+                        mtime_ns = dirent.stat().st_mtime_ns
+                        previous = saved.get(dirent.name)
+                        if previous and previous[0] == mtime_ns:
+                            entries[dirent.name] = previous
+                            continue
+                        point = _read_sidecar(dirent.path)
+                        parsed += 1
+                    except Exception as e:
+                        logging.debug(f"[PwnIOS] Skipping sidecar {dirent.path}: {e}")
+                        continue
+                    if point:
+                        entries[dirent.name] = (mtime_ns,) + point
+        except FileNotFoundError:
+            logging.info(f"[PwnIOS] Handshake directory {self.handshake_dir} not found, index starts empty")
+
+        with self._lock:
+            # Keep sidecars add()ed while the scan was running
+            for name, entry in self._entries.items():
+                entries.setdefault(name, entry)
+            self._entries.clear()
+            self._buckets.clear()
+            for name, entry in entries.items():
+                self._insert(name, entry)
+            self.parsed += parsed
+            self.ready = True
+
+        if parsed or len(entries) != len(saved):
+            self.save()
+        logging.info(f"[PwnIOS] Handshake index ready: {len(entries)} located handshakes, "
+                     f"{parsed} sidecars parsed in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def add(self, sidecar_path, record):
+        """Indexes a freshly written sidecar; call save() once per batch."""
+        try:
+            mtime_ns = os.stat(sidecar_path).st_mtime_ns
+        except OSError:
+            return
+        point = _read_sidecar_record(record)
+        if point is None:
+            return
+        with self._lock:
+            self._insert(os.path.basename(sidecar_path), (mtime_ns,) + point)
+
+    def save(self):
+        # Snapshot under the save lock too, so an older snapshot can't replace a newer one
+        with self._save_lock:
+            with self._lock:
+                stored = {'version': self.VERSION, 'cell': self.cell, 'entries': dict(self._entries)}
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w') as fp:
+                    json.dump(stored, fp, separators=(',', ':'))
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.error(f"[PwnIOS] Error saving handshake index {self.path}: {e}")
+
+    def query(self, min_lat, min_lon, max_lat, max_lon):
+        """Point tuples (see FIELDS) inside the box; min_lon > max_lon wraps the antimeridian."""
+        wraps = min_lon > max_lon
+
+        def lon_inside(lon):
+            return (lon >= min_lon or lon <= max_lon) if wraps else min_lon <= lon <= max_lon
+
+        with self._lock:
+            row_lo, col_lo = self._bucket(min_lat, min_lon)
+            row_hi, col_hi = self._bucket(max_lat, max_lon)
+            cols = (col_lo - col_hi) if wraps else (col_hi - col_lo)
+            # Walk the overlapped cells for small boxes, every populated bucket for large ones
+            if wraps or (row_hi - row_lo + 1) * (cols + 1) > len(self._buckets):
+                buckets = [bucket for (row, _), bucket in self._buckets.items() if row_lo <= row <= row_hi]
+            else:
+                buckets = [self._buckets[(row, col)]
+                           for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1)
+                           if (row, col) in self._buckets]
+            return [point for bucket in buckets for point in bucket.values()
+                    if min_lat <= point[0] <= max_lat and lon_inside(point[1])]
+
+    @staticmethod
+    def cluster(points, zoom, cells_per_tile=4):
+        """Groups points into a grid sized for web-map `zoom`, about `cells_per_tile` per 256px tile.
+
+        Returns (singles, clusters): buckets holding one point are passed through
+        as-is, the rest become (centroid latitude, centroid longitude, count).
+        """
+        size = 360.0 / (2 ** max(0, min(int(zoom), 22))) / cells_per_tile
+        grid = {}
+        for point in points:
+            grid.setdefault((int(point[0] // size), int(point[1] // size)), []).append(point)
+        singles, clusters = [], []
+        for members in grid.values():
+            if len(members) == 1:
+                singles.append(members[0])
+            else:
+                clusters.append((
+                    round(sum(p[0] for p in members) / len(members), 6),
+                    round(sum(p[1] for p in members) / len(members), 6),
+                    len(members),
+                ))
+        return singles, clusters
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'handshakes': len(self._entries),
+                'buckets': len(self._buckets),
+                'parsed': self.parsed,
+            }
+
+
+class _SensorSampler:
+    """Reads temperature and battery on a background thread so stats never touch sysfs or I2C.
+
+    `read_temperature` returns (text, celsius) and `read_battery` returns
+    (text, level, charging); a None reading means the sensor is unavailable. While
+    the battery can't be read, retries back off exponentially up to `max_backoff`
+    seconds instead of hitting the bus every cycle.
+    """
+
+    def __init__(self, read_temperature, read_battery, interval=10.0, history=30, max_backoff=600.0):
+        self.read_temperature = read_temperature
+        self.read_battery = read_battery
+        self.interval = max(1.0, float(interval))
+        self.max_backoff = max_backoff
+        self.temperature = "N/A"
+        self.battery = "N/A"
+        self.temperature_history = deque(maxlen=history)  # (timestamp, celsius)
+        self.battery_history = deque(maxlen=history)  # (timestamp, level, charging)
+        self.battery_backoff = 0.0
+        self._next_battery_read = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"[PwnIOS] Sensor sampler error: {e}")
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        now = time.time()
+        text, celsius = self.read_temperature()
+        self.temperature = text
+        if celsius is not None:
+            self.temperature_history.append((now, celsius))
+
+        if now < self._next_battery_read:
+            return
+        text, level, charging = self.read_battery()
+        self.battery = text
+        if level is None:
+            self.battery_backoff = min(self.max_backoff, max(self.interval, self.battery_backoff * 2))
+            self._next_battery_read = now + self.battery_backoff
+            logging.debug(f"[PwnIOS] Battery unavailable ({text}), next read in {self.battery_backoff:.0f}s")
+        else:
+            self.battery_backoff = 0.0
+            self.battery_history.append((now, level, charging))
+
+    def history(self):
+        return {
+            "temperature": [list(sample) for sample in self.temperature_history],
+            "battery": [list(sample) for sample in self.battery_history],
+            "battery_backoff": self.battery_backoff
+        }
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class _LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (max_ms for the open bucket)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class _Metrics:
+    """Counters and latency histograms keyed by dotted names, e.g. handler.get_stats.
+
+    Updated from the event loop, the agent thread (on_handshake) and the sidecar
+    writer thread, so every access goes through a lock; snapshots are plain dicts.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, ms):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = _LatencyHistogram()
+            histogram.observe(ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime': round(time.time() - self.started, 1),
+                'counters': dict(sorted(self.counters.items())),
+                'latency': {name: h.summary() for name, h in sorted(self.histograms.items())},
+            }
+
+
+# High-frequency agent events where only the latest value matters to the app
+COALESCED_EVENT_TYPES = ('channel_hop', 'wifi_update')
+
+
+class _EventCoalescer:
+    """Merges bursts of same-type events on the event loop before they reach the broadcaster.
+
+    The first event of a type opens a `window`-second timer; later events of that
+    type replace the pending one, and only the newest is emitted when the timer
+    fires. Broadcast volume is then bounded by the window, not the callback rate.
+    Must only be used from the loop thread.
+    """
+
+    def __init__(self, loop, emit, window=0.5, types=COALESCED_EVENT_TYPES):
+        self.loop = loop
+        self.emit = emit
+        self.window = window
+        self.types = frozenset(types)
+        self._pending = {}  # type -> latest message
+        self._timers = {}
+        self.received = 0
+        self.emitted = 0
+
+    def offer(self, message):
+        """Returns True if the message was absorbed and will be emitted later."""
+        msg_type = message.get('type')
+        if self.window <= 0 or msg_type not in self.types:
+            return False
+
+        self.received += 1
+        self._pending[msg_type] = message
+        if msg_type not in self._timers:
+            self._timers[msg_type] = self.loop.call_later(self.window, self._flush, msg_type)
+        return True
+
+    def _flush(self, msg_type):
+        self._timers.pop(msg_type, None)
+        message = self._pending.pop(msg_type, None)
+        if message is not None:
+            self.emitted += 1
+            self.emit(message)
+
+    def cancel(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._pending.clear()
+
+    def stats(self):
+        return {
+            'window': self.window,
+            'received': self.received,
+            'emitted': self.emitted,
+            'merged': self.received - self.emitted - len(self._pending),
+        }
+
+
+class _SnapshotCache:
+    """Shares one built snapshot between all callers for `ttl` seconds.
+
+    Refreshes are single-flight: concurrent callers that find the snapshot stale
+    wait for the one build in progress instead of each walking the agent again.
+    The returned object is shared, so callers must treat it as read-only.
+    """
+
+    def __init__(self, builder, ttl=2.0):
+        self.builder = builder
+        self.ttl = ttl
+        self._value = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.max_build_ms = 0.0
+        self.total_build_ms = 0.0
+
+    def _fresh(self):
+        return self._value is not None and time.monotonic() - self._built_at < self.ttl
+
+    def peek(self):
+        """The current snapshot if it is still fresh, else None; never builds."""
+        # Non-blocking, so the loop never waits behind a build running on the pool
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self._fresh():
+                self.hits += 1
+                return self._value
+            return None
+        finally:
+            self._lock.release()
+
+    def get(self):
+        with self._lock:
+            # Another caller may have refreshed it while we waited
+            if self._fresh():
+                self.hits += 1
+                return self._value
+
+            started = time.perf_counter()
+            value = self.builder()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self._value = value
+            self._built_at = time.monotonic()
+            self.builds += 1
+            self.last_build_ms = elapsed_ms
+            self.max_build_ms = max(self.max_build_ms, elapsed_ms)
+            self.total_build_ms += elapsed_ms
+            logging.debug(f"[PwnIOS] Stats snapshot built in {elapsed_ms:.1f}ms")
+            return value
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'builds': self.builds,
+            'ttl': self.ttl,
+            'last_build_ms': round(self.last_build_ms, 2),
+            'max_build_ms': round(self.max_build_ms, 2),
+            'avg_build_ms': round(self.total_build_ms / self.builds, 2) if self.builds else 0.0,
+        }
+
+
+def _format_access_point(ap):
+    if isinstance(ap, dict):
+        return {
+            # bettercap reports the BSSID as `mac`; `bssid` is kept for other agents
+            'bssid': ap.get('mac') or ap.get('bssid', ''),
+            'hostname': ap.get('hostname', ap.get('ssid', '')),
+            'channel': ap.get('channel', 0),
+            'rssi': ap.get('rssi', 0),
+            'encryption': ap.get('encryption', ''),
+            'vendor': ap.get('vendor', '')
+        }
+    return {
+        'bssid': str(ap),
+        'hostname': str(ap),
+        'channel': 0,
+        'rssi': 0,
+        'encryption': '',
+        'vendor': ''
+    }
+
+
+class _AccessPointIndex:
+    """Latest scan keyed by BSSID, diffed scan-to-scan into sequenced deltas.
+
+    Each update that changes anything bumps `seq`. A delta lists added APs in
+    full, removed BSSIDs, and only the fields that changed for existing APs.
+    Clients apply deltas on top of an access_points snapshot, ignore deltas
+    with seq <= their snapshot's seq, and re-request the snapshot on a gap.
+    """
+
+    def __init__(self):
+        self._aps = {}
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    def update(self, access_points):
+        """Replaces the index with a new scan; returns the delta, or None if nothing changed."""
+        new = {}
+        for ap in access_points:
+            formatted = _format_access_point(ap)
+            if not formatted['bssid']:
+                # Without a key it can't be diffed, and would collide with other unkeyed records
+                continue
+            new[formatted['bssid']] = formatted
+
+        with self._lock:
+            old = self._aps
+            added = [ap for bssid, ap in new.items() if bssid not in old]
+            removed = [bssid for bssid in old if bssid not in new]
+            changed = []
+            for bssid, ap in new.items():
+                previous = old.get(bssid)
+                if previous is not None and previous != ap:
+                    fields = {key: value for key, value in ap.items() if previous.get(key) != value}
+                    fields['bssid'] = bssid
+                    changed.append(fields)
+
+            self._aps = new
+            if not (added or removed or changed):
+                return None
+
+            self.seq += 1
+            return {
+                'seq': self.seq,
+                'base_seq': self.seq - 1,
+                'count': len(new),
+                'added': added,
+                'removed': removed,
+                'changed': changed
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return self.seq, list(self._aps.values())
+
+
+def _compression_extensions(threshold=256, window_bits=11, mem_level=4):
+    """permessage-deflate server extension that skips small messages and face image frames.
+
+    Face image frames (BINARY_FRAME_MAGIC header) carry already-compressed PNGs, and
+    deflating a keepalive or pong costs more CPU than the bytes it saves. MessagePack
+    and CBOR replies are binary too, but compress like JSON, so they get the same size
+    threshold as text. Skipped messages go out with RSV1 unset, which RFC 7692 allows
+    alongside compressed ones.
+    """
+    from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+    from websockets.frames import Opcode
+
+    window_bits = min(15, max(9, int(window_bits)))
+    mem_level = min(9, max(1, int(mem_level)))
+
+    class ThresholdPerMessageDeflate(PerMessageDeflate):
+        def encode(self, frame):
+            if frame.fin and frame.opcode in (Opcode.TEXT, Opcode.BINARY) and (
+                    len(frame.data) < threshold or
+                    (frame.opcode is Opcode.BINARY and bytes(frame.data[:2]) == BINARY_FRAME_MAGIC)):
+                return frame
+            return super().encode(frame)
+
+    class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+        def process_request_params(self, params, accepted_extensions):
+            response_params, extension = super().process_request_params(params, accepted_extensions)
+            return response_params, ThresholdPerMessageDeflate(
+                extension.remote_no_context_takeover,
+                extension.local_no_context_takeover,
+                extension.remote_max_window_bits,
+                extension.local_max_window_bits,
+                extension.compress_settings
+            )
+
+    return [ThresholdDeflateFactory(
+        server_max_window_bits=window_bits,
+        client_max_window_bits=window_bits,
+        compress_settings={'memLevel': mem_level}
+    )]
+
+
+class _JsonCodec:
+    """JSON text frames. Uses orjson or ujson when installed, stdlib json otherwise."""
+
+    name = 'json'
+    subprotocol = 'pwnios.json'
+    binary = False
+    decode_errors = (ValueError, TypeError)
+
+    def __init__(self, fast=True):
+        self.backend = 'json'
+        self._fast_dumps = None
+        self._loads = json.loads
+        if not fast:
+            return
+        try:
+            import orjson
+            self.backend = 'orjson'
+            self._fast_dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+            self._loads = orjson.loads
+            return
+        except ImportError:
+            pass
+        try:
+            import ujson
+            self.backend = 'ujson'
+            self._fast_dumps = ujson.dumps
+            self._loads = ujson.loads
+        except ImportError:
+            pass
+
+    def encode(self, message):
+        if self._fast_dumps is not None:
+            try:
+                return self._fast_dumps(message)
+            except (TypeError, OverflowError):
+                pass  # Types the fast backend rejects (e.g. huge ints) still go out via stdlib json
+        return json.dumps(message)
+
+    def decode(self, data):
+        return self._loads(data)
+
+
+class _MsgPackCodec:
+    """MessagePack binary frames (subprotocol pwnios.msgpack)."""
+
+    name = 'msgpack'
+    subprotocol = 'pwnios.msgpack'
+    binary = True
+    decode_errors = (ValueError, TypeError)
+
+    def __init__(self):
+        import msgpack
+        self.backend = 'msgpack'
+        self._msgpack = msgpack
+
+    def encode(self, message):
+        return self._msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, data):
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class _CborCodec:
+    """CBOR binary frames (subprotocol pwnios.cbor)."""
+
+    name = 'cbor'
+    subprotocol = 'pwnios.cbor'
+    binary = True
+    decode_errors = (ValueError, TypeError)
+
+    def __init__(self):
+        import cbor2
+        self.backend = 'cbor2'
+        self._cbor2 = cbor2
+
+    def encode(self, message):
+        return self._cbor2.dumps(message)
+
+    def decode(self, data):
+        return self._cbor2.loads(data)
+
+
+_CODECS = None
+
+
+def _available_codecs():
+    """Codecs whose backends are installed, in server preference order. The JSON codec is always last."""
+    global _CODECS
+    if _CODECS is None:
+        codecs = []
+        for codec_class in (_MsgPackCodec, _CborCodec):
+            try:
+                codecs.append(codec_class())
+            except ImportError:
+                pass
+        codecs.append(_JsonCodec())
+        _CODECS = codecs
+    return _CODECS
+
+
+def _default_codec():
+    return _available_codecs()[-1]
+
+
+def _codec_for_subprotocol(subprotocol):
+    for codec in _available_codecs():
+        if codec.subprotocol == subprotocol:
+            return codec
+    return _default_codec()
+
+
+def _select_subprotocol(first, second):
+    """Pick a codec subprotocol, or None so clients that offer nothing still get plain JSON.
+
+    websockets >= 14 calls this as (connection, client_offers); the legacy
+    implementation calls it as (client_offers, server_offers).
+    """
+    offered = first if isinstance(first, (list, tuple)) else second
+    for codec in _available_codecs():
+        if codec.subprotocol in offered:
+            return codec.subprotocol
+    return None
+
+
+class _Subscription:
+    """Which broadcast types (topics) a client wants. Topic filters may use * wildcards.
+
+    A new connection is subscribed to everything. Unsubscribing from a topic that
+    is still covered by a wildcard records it as an exclusion.
+    """
+
+    def __init__(self, topics=('*',)):
+        self.include = set(topics)
+        self.exclude = set()
+        self._matches = {}  # msg_type -> bool
+
+    def subscribe(self, topics):
+        for topic in topics:
+            self.include.add(topic)
+            self.exclude.discard(topic)
+        self._matches.clear()
+
+    def unsubscribe(self, topics):
+        for topic in topics:
+            self.include.discard(topic)
+            if any(fnmatch.fnmatchcase(topic, pattern) for pattern in self.include):
+                self.exclude.add(topic)
+        self._matches.clear()
+
+    def matches(self, msg_type):
+        matched = self._matches.get(msg_type)
+        if matched is None:
+            matched = (
+                any(fnmatch.fnmatchcase(msg_type, pattern) for pattern in self.include)
+                and not any(fnmatch.fnmatchcase(msg_type, pattern) for pattern in self.exclude)
+            )
+            self._matches[msg_type] = matched
+        return matched
+
+    def describe(self):
+        return {"topics": sorted(self.include), "excluded": sorted(self.exclude)}
+
+
+# Broadcast types not worth replaying to a resuming client
+REPLAY_SKIP_TYPES = frozenset(('keepalive',))
+
+
+class _BroadcastEntry:
+    """One sequenced broadcast, with its routing and lazily encoded payloads.
+
+    Entries are kept in the replay buffer, so a message resent on resume reuses the
+    payload already encoded for that codec instead of serializing it again.
+    """
+
+    __slots__ = ('seq', 'msg_type', 'message', 'binary_frame', 'only_for', 'unless', 'encoded')
+
+    def __init__(self, seq, message):
+        # Face images may carry a pre-built binary frame for clients that opted in
+        self.binary_frame = message.pop('_binary', None)
+        # Capability-gated messages: only for clients with / without a capability
+        self.only_for = message.pop('_capability', None)
+        self.unless = message.pop('_without_capability', None)
+        message['seq'] = seq
+        self.seq = seq
+        self.msg_type = message.get('type')
+        self.message = message
+        self.encoded = {}  # codec name -> payload
+
+    def payload_for(self, codec):
+        payload = self.encoded.get(codec.name)
+        if payload is None:
+            payload = self.encoded[codec.name] = codec.encode(self.message)
+        return payload
+
+
+class _SharedResponse:
+    """A response built once for several requesters, encoded at most once per codec."""
+
+    __slots__ = ('message', 'encoded')
+
+    def __init__(self, message):
+        self.message = message
+        self.encoded = {}
+
+    payload_for = _BroadcastEntry.payload_for
+
+
+class _RequestCoalescer:
+    """Single-flight for expensive request handlers; lives on the event loop.
+
+    A caller asking for a key that is already being computed awaits that
+    computation instead of starting its own. With `linger` > 0 a finished result
+    is also reused for that many seconds, trading freshness for fewer rebuilds;
+    off by default, since rebuilds run on the blocking pool and no longer stall
+    the loop. Results are shared between requesters and must be treated as read-only.
+    """
+
+    def __init__(self, linger=0.0):
+        self.linger = linger
+        self._inflight = {}  # key -> Future
+        self._recent = {}  # key -> (finished_at, result)
+        self.computed = 0
+        self.shared = 0
+
+    async def get(self, key, compute):
+        recent = self._recent.get(key)
+        if recent is not None and time.monotonic() - recent[0] < self.linger:
+            self.shared += 1
+            return recent[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The computing request was cancelled, not us: compute it ourselves
+                return await self.get(key, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on it; don't let an unobserved failure warn at GC
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(result)
+        self.computed += 1
+        if self.linger:
+            now = time.monotonic()
+            if len(self._recent) >= 32:
+                self._recent = {k: v for k, v in self._recent.items() if now - v[0] < self.linger}
+            self._recent[key] = (now, result)
+        return result
+
+    def stats(self):
+        return {
+            'computed': self.computed,
+            'shared': self.shared,
+            'in_flight': len(self._inflight),
+        }
+
+
+def _diff_stats(old, new):
+    """Top-level keys of `new` that differ from `old`, and keys that disappeared."""
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+class _FaceImageCache:
+    """Resolves face names to PNG paths once and keeps the raw and base64 payloads in a bounded LRU.
+
+    Entries are revalidated with a single os.stat() and reloaded when the file's
+    mtime, inode or size changes. Names that resolve to nothing are remembered for
+    `miss_ttl` seconds so unknown faces don't re-probe every base path each call.
+    """
+
+    def __init__(self, max_entries=32, miss_ttl=60.0, base_paths=None):
+        self.max_entries = max(1, int(max_entries))
+        self.miss_ttl = miss_ttl
+        self.base_paths = base_paths or FACE_BASE_PATHS
+        self._paths = {}  # face name -> resolved path, or (None, resolved_at)
+        self._entries = OrderedDict()  # path -> (mtime_ns, inode, size, raw, encoded)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _resolve(self, face_name):
+        cached = self._paths.get(face_name)
+        if isinstance(cached, str):
+            return cached
+        if cached is not None and time.time() - cached[1] < self.miss_ttl:
+            return None
+
+        path = next(self._candidates(face_name), None)
+        self._paths[face_name] = path if path is not None else (None, time.time())
+        return path
+
+    def _candidates(self, face_name):
+        """Existing PNG paths for face_name, in lookup order (base path, then name variant)."""
+        face_variations = [face_name, face_name.upper(), face_name.lower(), face_name.capitalize()]
+        for base_path in self.base_paths:
+            for face_var in face_variations:
+                full_path = f"{base_path}/{face_var}.png"
+                if os.path.isfile(full_path):
+                    yield full_path
+
+    def _load(self, face_name):
+        path = self._resolve(face_name)
+        if path is None:
+            self.misses += 1
+            return None
+
+        entry, cached = self._read(path)
+        if entry is None:
+            # Gone or unreadable: fall through to the next path / name variant, as a fresh lookup would
+            self._paths.pop(face_name, None)
+            tried = {path}
+            for candidate in self._candidates(face_name):
+                if candidate in tried:
+                    continue
+                tried.add(candidate)
+                entry, cached = self._read(candidate)
+                if entry is not None:
+                    self._paths[face_name] = candidate
+                    break
+
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def _read(self, path):
+        """(entry, served_from_cache); entry is None if path can't be stat'ed or read."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return None, False
+
+        entry = self._entries.get(path)
+        if entry and entry[:3] == (st.st_mtime_ns, st.st_ino, st.st_size):
+            self._entries.move_to_end(path)
+            return entry, True
+
+        if entry:
+            self.reloads += 1
+
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except Exception as e:
+            logging.error(f"[PwnIOS] Error reading face file {path}: {e}")
+            self._entries.pop(path, None)
+            return None, False
+
+        logging.info(f"[PwnIOS] Found face image: {path}")
+        entry = (st.st_mtime_ns, st.st_ino, st.st_size, raw, binascii.b2a_base64(raw, newline=False).decode("ascii"))
+        self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry, False
+
+    def get(self, face_name):
+        """Base64-encoded PNG for the JSON protocol, or None."""
+        with self._lock:
+            entry = self._load(face_name)
+            return entry[4] if entry else None
+
+    def get_bytes(self, face_name):
+        """Raw PNG bytes for binary frames, or None."""
+        with self._lock:
+            entry = self._load(face_name)
+            return entry[3] if entry else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+class _MessageHandler:
+    __slots__ = ('func', 'requires_agent', 'ack', 'metric', 'timer', 'error_metric')
+
+    def __init__(self, func, msg_type, requires_agent, ack):
+        self.func = func
+        self.requires_agent = requires_agent
+        self.ack = ack
+        # Metric names are built once here rather than per message
+        self.metric = f"messages_in.{msg_type}"
+        self.timer = f"handler.{msg_type}"
+        self.error_metric = f"handler_errors.{msg_type}"
+
+
+MESSAGE_HANDLERS = {}
+
+
+def _message_handler(*msg_types, requires_agent=False, ack=True):
+    """Registers a PwnIOS coroutine method `(self, websocket, data)` for the given inbound message types.
+
+    `requires_agent` answers with an error instead of calling the handler before
+    on_ready; `ack` controls whether a request carrying a message_id is acknowledged.
+    """
+    def register(func):
+        for msg_type in msg_types:
+            MESSAGE_HANDLERS[msg_type] = _MessageHandler(func, msg_type, requires_agent, ack)
+        return func
+    return register
+
 
 class PwnIOS(plugins.Plugin):
     __author__ = "PellTech"
@@ -70,23 +1681,67 @@ class PwnIOS(plugins.Plugin):
         self.gps_data = None
         self.gps_enabled = False
         self.last_gps_update = None
+        self.gps_raw = None
+        self.gps_filter = _GPSFixFilter()
+        self.gps_log_writer = None
+        self.sidecar_writer = None
+        self.handshake_index = None
         
         self.websocket_server = None
         self.connected_clients = set()
         self.client_health = {}
+        self.client_capabilities = {}
+        self.client_stats_state = {}
+        self.client_outboxes = {}
+        self.client_codecs = {}
+        self.client_subscriptions = {}  # absent = subscribed to everything
+
+        # Session resume: every broadcast gets a sequence number, recent ones are replayable
+        self.session_id = os.urandom(4).hex()
+        self.broadcast_seq = 0
+        self.replay_buffer = deque(maxlen=256)
+        self.replay_floor = 0  # highest seq that has fallen out of the replay buffer
+        self.replay_latest = {}  # (type, only_for, unless) -> newest entry of a coalescible type
+        self.ap_index = _AccessPointIndex()
         self.loop = None
-        self.message_queue = None
+        self.message_queue = None  # deque of (enqueued_at, message), bounded by _put_broadcast
+        self.message_wakeup = None
+        self.message_queue_size = 256
+        # Agent callbacks hand events to the loop through this deque (see queue_message)
+        self.handoff = deque()
+        self.handoff_lock = threading.Lock()
+        self.handoff_scheduled = False
+        self.event_coalescer = None
         self.server_thread = None
         
         self.broadcaster_task = None
         self.heartbeat_task = None
+        self.metrics_task = None
+        self.loop_lag_task = None
+        # Threading rules:
+        # * event loop only: connected_clients, client_* dicts, outboxes, message_queue,
+        #   replay buffer / broadcast_seq, gps_enabled, event and request coalescers
+        # * blocking pool (_run_blocking): agent introspection, file and sysfs reads, base64,
+        #   subprocesses. Jobs may only use their arguments, read the agent, and call the
+        #   lock-protected helpers (face_cache, stats_cache, ap_index); results go back to
+        #   the loop as return values, never written into plugin state from the pool
+        # * agent thread: queue_message handoff, face_snapshot, ap_index.update, GPS writers
+        self.blocking_executor = None
+        self.blocking_slots = None
+        self.blocking_jobs = 0
+        self.metrics = _Metrics()
         
         self.pisugar = None
         self.pisugar_error = None
+        self.sensor_sampler = None
         
         self.last_face = None
         self.last_status = None
-        self.ui_update_counter = 0
+        self.face_snapshot = None
+
+        self.face_cache = _FaceImageCache()
+        self.stats_cache = _SnapshotCache(self._get_stats_from_agent)
+        self.request_coalescer = _RequestCoalescer()
 
     def _init_pisugar(self):
         # Read user config
@@ -133,19 +1788,65 @@ class PwnIOS(plugins.Plugin):
 
 
     def on_loaded(self):
+        started = time.perf_counter()
         self.running = True
-        logging.info("[PwnIOS] Plugin loaded")
         
-        self._init_pisugar()
+        self.face_cache = _FaceImageCache(max_entries=self.options.get('face_cache_size', 32))
+        self.replay_buffer = deque(maxlen=max(1, int(self.options.get('replay_buffer_size', 256))))
+        self.stats_cache = _SnapshotCache(self._get_stats_from_agent, ttl=self.options.get('stats_ttl', 2.0))
+        self.request_coalescer = _RequestCoalescer(linger=self.options.get('request_coalesce_window', 0))
+        self.gps_filter = _GPSFixFilter(
+            min_distance=self.options.get('gps_min_distance', 5.0),
+            max_interval=self.options.get('gps_max_interval', 30.0),
+            max_accuracy=self.options.get('gps_max_accuracy', 0)
+        )
+        self.sensor_sampler = _SensorSampler(
+            self._read_temperature, self._read_battery_info,
+            interval=self.options.get('sensor_interval', 10.0),
+            history=self.options.get('sensor_history', 30),
+            max_backoff=self.options.get('battery_max_backoff', 600.0)
+        )
         
-        # Log PiSugar status
+        # PiSugar probing and the websocket stack are set up on the server thread
+        self.server_thread = threading.Thread(target=self._start_websocket_server, daemon=True)
+        self.server_thread.start()
+
+        loaded_ms = (time.perf_counter() - started) * 1000
+        self.metrics.observe('startup.import', _IMPORT_SECONDS * 1000)
+        self.metrics.observe('startup.on_loaded', loaded_ms)
+        logging.info(f"[PwnIOS] Plugin loaded (import {_IMPORT_SECONDS * 1000:.1f}ms, on_loaded {loaded_ms:.1f}ms)")
+
+    def _deferred_setup(self):
+        started = time.perf_counter()
+        self._init_pisugar()
         if self.pisugar_error:
             logging.warning(f"[PwnIOS] Battery monitoring unavailable: {self.pisugar_error}")
         elif PISUGAR_AVAILABLE:
             logging.info("[PwnIOS] Battery monitoring available")
-        
-        self.server_thread = threading.Thread(target=self._start_websocket_server, daemon=True)
-        self.server_thread.start()
+        probed = time.perf_counter()
+
+        # Local workers come before the websocket stack: GPS sidecars, sensor sampling and
+        # the handshake index don't need it and must keep working if importing it fails
+        if self.sensor_sampler and self.running:
+            self.sensor_sampler.start()
+        if self.running:
+            # Created here rather than on first handshake, so on_handshake never starts threads
+            self.sidecar_writer = _SidecarWriter(
+                max_pending=self.options.get('handshake_queue_size', 64),
+                flush_interval=self.options.get('sidecar_flush_interval', 0.5),
+                metrics=self.metrics,
+                on_written=self._index_sidecars
+            )
+        # Scanning thousands of sidecars shouldn't hold up the websocket server
+        threading.Thread(target=self._build_handshake_index, daemon=True).start()
+        self.metrics.observe('startup.pisugar', (probed - started) * 1000)
+
+        importing = time.perf_counter()
+        _import_network_stack()
+        imported = time.perf_counter()
+        self.metrics.observe('startup.network_import', (imported - importing) * 1000)
+        logging.info(f"[PwnIOS] Deferred setup done (websocket stack {(imported - importing) * 1000:.1f}ms, "
+                     f"PiSugar {(probed - started) * 1000:.1f}ms)")
 
     def on_ready(self, agent):
         self.agent = agent
@@ -157,6 +1858,7 @@ class PwnIOS(plugins.Plugin):
         self._cleanup_resources()
         logging.info("[PwnIOS] Plugin unloaded")
         
+    @_message_handler('gps_data')
     async def _handle_gps_data(self, websocket, full_message_data):
         try:
             gps_payload = full_message_data.get('data', {})
@@ -166,20 +1868,40 @@ class PwnIOS(plugins.Plugin):
                 await self._send_error(websocket, "GPS data error: latitude or longitude missing.")
                 return
 
-            self.gps_data = {
+            fix = {
                 'enabled': True,
                 'latitude': gps_payload.get('latitude'),
                 'longitude': gps_payload.get('longitude'),
                 'accuracy': gps_payload.get('accuracy'),
                 'last_update': datetime.now().isoformat()
             }
+            # A fix after a stale gap must be accepted even from the same spot, so expire first
+            self._expire_gps_fix()
+            # Every fix proves the phone is still feeding us, even one we don't keep
+            self.gps_raw = fix
             self.last_gps_update = datetime.now()
+
+            dropped = self.gps_filter.offer(float(fix['latitude']), float(fix['longitude']), fix['accuracy'])
+            if dropped:
+                self.metrics.incr(f"gps.dropped.{dropped}")
+                logging.debug(f"[PwnIOS] GPS fix dropped ({dropped}): {fix['latitude']:.6f}, {fix['longitude']:.6f}")
+                if any(self._has_capability(client, 'gps_full_rate') for client in list(self.connected_clients)):
+                    await self._broadcast_to_clients({
+                        "type": "gps_update",
+                        "data": fix,
+                        "filtered": True,
+                        "_capability": 'gps_full_rate'
+                    })
+                return
+
+            self.metrics.incr('gps.accepted')
+            self.gps_data = fix
             self.gps_enabled = True
 
             logging.info(f"[PwnIOS] GPS data received: {self.gps_data['latitude']:.6f}, {self.gps_data['longitude']:.6f}")
 
             if self.options.get('save_gps_log', False):
-                await self._save_gps_log(self.gps_data)
+                self._save_gps_log(self.gps_data)
 
             await self._broadcast_to_clients({
                 "type": "gps_update",
@@ -190,21 +1912,113 @@ class PwnIOS(plugins.Plugin):
             logging.error(f"[PwnIOS] GPS data error: {e}")
             await self._send_error(websocket, f"GPS data error: {str(e)}")
             
+    def _gps_fix_stale(self):
+        if not self.last_gps_update:
+            return False
+        return (datetime.now() - self.last_gps_update).total_seconds() > 300  # 5 minutes
+
     def _get_gps_data(self):
-        if not self.gps_data or not self.gps_enabled:
+        # Read-only: also called from the blocking pool and the UI thread
+        if not self.gps_data or not self.gps_enabled or self._gps_fix_stale():
             return None
-
-        if self.last_gps_update:
-            time_diff = (datetime.now() - self.last_gps_update).total_seconds()
-            if time_diff > 300:  # 5 minutes
-                self.gps_enabled = False
-                return None
-
         return self.gps_data
+
+    def _expire_gps_fix(self):
+        """Marks GPS disabled once the last fix is too old. Loop thread only."""
+        if self.gps_enabled and self._gps_fix_stale():
+            self.gps_enabled = False
+            # Otherwise, with gps_max_interval = 0, a phone resuming from the same spot is
+            # dropped for distance and GPS stays disabled until it moves
+            self.gps_filter.reset()
+            logging.info("[PwnIOS] GPS fix is stale, marking GPS disabled")
     
-    async def _save_gps_log(self, gps_data):
+    def _gps_log_format(self):
+        return 'binary' if self.options.get('gps_log_format', 'json') == 'binary' else 'json'
+
+    def _gps_log_path(self):
+        return self.options.get('gps_log_path', GPS_LOG_DEFAULT_PATHS[self._gps_log_format()])
+
+    def _index_sidecars(self, written):
+        # Sidecar writer thread; the index may still be rebuilding, in which case its scan picks these up
+        if self.handshake_index is None:
+            return
+        for path, record in written:
+            self.handshake_index.add(path, record)
+        if self.handshake_index.ready:
+            self.handshake_index.save()
+
+    def _build_handshake_index(self):
+        handshake_dir = self.options.get('handshakes_dir', '/root/handshakes')
+        index_path = self.options.get('handshake_index_path') or os.path.join(handshake_dir, '.pwnios_index.json')
+        index = _HandshakeIndex(index_path, handshake_dir, cell=self.options.get('handshake_index_cell', 0.01))
+        self.handshake_index = index
+        try:
+            index.rebuild()
+        except Exception as e:
+            logging.error(f"[PwnIOS] Handshake index rebuild failed: {e}")
+
+    @_message_handler('get_handshakes_in_bbox')
+    async def _send_handshakes_in_bbox(self, websocket, data):
+        request = data.get('data', {}) or {}
         try:
-            log_path = self.options.get('gps_log_path', '/tmp/pwnagotchi_gps.log')
+            min_lat, min_lon = float(request['min_lat']), float(request['min_lon'])
+            max_lat, max_lon = float(request['max_lat']), float(request['max_lon'])
+        except (KeyError, TypeError, ValueError):
+            await self._send_error(websocket, "get_handshakes_in_bbox requires numeric min_lat, min_lon, max_lat, max_lon")
+            return
+        if self.handshake_index is None or not self.handshake_index.ready:
+            await self._send_error(websocket, "Handshake index is still loading, try again shortly")
+            return
+
+        points = self.handshake_index.query(min_lat, min_lon, max_lat, max_lon)
+        total = len(points)
+        zoom = request.get('zoom')
+        try:
+            max_points = int(request.get('max_points', self.options.get('handshake_bbox_max_points', 500)))
+        except (TypeError, ValueError):
+            max_points = 500
+        clusters = []
+        # Small result sets go out as-is; larger ones are clustered to the map's zoom level
+        if isinstance(zoom, (int, float)) and total > max_points:
+            points, clusters = _HandshakeIndex.cluster(points, zoom)
+
+        await self._send_message(websocket, {
+            "type": "handshakes_in_bbox",
+            "data": {
+                "bbox": [min_lat, min_lon, max_lat, max_lon],
+                "zoom": zoom,
+                "total": total,
+                "fields": list(_HandshakeIndex.FIELDS),
+                "points": points,
+                "cluster_fields": list(_HandshakeIndex.CLUSTER_FIELDS),
+                "clusters": clusters
+            }
+        })
+
+    def _get_gps_log_writer(self):
+        if self.gps_log_writer is None:
+            self.gps_log_writer = _RotatingLogWriter(
+                self._gps_log_path(),
+                flush_size=self.options.get('gps_log_flush_size', 20),
+                flush_interval=self.options.get('gps_log_flush_interval', 5.0),
+                max_bytes=self.options.get('gps_log_max_bytes', 5 * 1024 * 1024),
+                max_age=self.options.get('gps_log_max_age', 0),
+                backups=self.options.get('gps_log_backups', 3),
+                fsync=self.options.get('gps_log_fsync', 'rotate')
+            )
+        return self.gps_log_writer
+
+    def _save_gps_log(self, gps_data):
+        # Only buffers the entry; the writer thread does the file I/O
+        try:
+            if self._gps_log_format() == 'binary':
+                self._get_gps_log_writer().append(GPS_TRACK_RECORD.pack(
+                    time.time(),
+                    float(gps_data['latitude']),
+                    float(gps_data['longitude']),
+                    float(gps_data.get('accuracy') or 0.0)
+                ))
+                return
 
             log_entry = {
                 'timestamp': datetime.now().isoformat(),
@@ -212,27 +2026,57 @@ class PwnIOS(plugins.Plugin):
                 'longitude': gps_data['longitude'],
                 'accuracy': gps_data['accuracy']
             }
-
-            with open(log_path, 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
+            self._get_gps_log_writer().append((json.dumps(log_entry) + '\n').encode('utf-8'))
 
         except Exception as e:
             logging.error(f"[PwnIOS] GPS log save error: {e}")
             
-    async def _send_gps_data(self, websocket):
+    @_message_handler('get_gps_track')
+    async def _send_gps_track(self, websocket, data):
+        if self._gps_log_format() != 'binary':
+            await self._send_error(websocket, "GPS track queries require gps_log_format = \"binary\"")
+            return
+
+        request = data.get('data', {}) or {}
+        reader = _GPSTrackReader(self._gps_log_path(), backups=self.options.get('gps_log_backups', 3))
+        points = await self._run_blocking(reader.query, request.get('start'), request.get('end'))
+        total = len(points)
+        points = _GPSTrackReader.decimate(points, request.get('max_points'))
+
+        await self._send_message(websocket, {
+            "type": "gps_track",
+            "data": {
+                "start": request.get('start'),
+                "end": request.get('end'),
+                "total": total,
+                "count": len(points),
+                "fields": ["timestamp", "latitude", "longitude", "accuracy"],
+                "points": points
+            }
+        })
+
+    @_message_handler('get_gps_data')
+    async def _send_gps_data(self, websocket, data=None):
+        self._expire_gps_fix()
         gps_data = self._get_gps_data()
-        await websocket.send(json.dumps({
+        # {"raw": true} asks for the latest fix even if the movement filter didn't keep it
+        if gps_data and ((data or {}).get('data') or {}).get('raw') and self.gps_raw:
+            gps_data = self.gps_raw
+        await self._send_message(websocket, {
             "type": "gps_data",
             "data": gps_data,
             "enabled": self.gps_enabled
-        }))
+        })
 
     def _cleanup_resources(self):
+        if self.sensor_sampler:
+            self.sensor_sampler.stop()
+
         if self.websocket_server:
             try: self.websocket_server.close()
             except: pass
             
-        for task in [self.broadcaster_task, self.heartbeat_task]:
+        for task in [self.broadcaster_task, self.heartbeat_task, self.metrics_task, self.loop_lag_task]:
             if task:
                 try: task.cancel()
                 except: pass
@@ -256,17 +2100,83 @@ class PwnIOS(plugins.Plugin):
             except Exception:
                 pass
             
+        if self.gps_log_writer:
+            self.gps_log_writer.close()
+            self.gps_log_writer = None
+
+        if self.sidecar_writer:
+            self.sidecar_writer.close()
+            self.sidecar_writer = None
+
         self.connected_clients.clear()
         self.client_health.clear()
+        self.client_capabilities.clear()
+        self.client_stats_state.clear()
+        self.client_outboxes.clear()
+        self.client_codecs.clear()
+        self.client_subscriptions.clear()
 
     def queue_message(self, message):
+        # Agent-thread side: append under a lock and wake the loop only if no drain is pending yet
         try:
-            if self.loop and self.loop.is_running() and self.message_queue:
-                asyncio.run_coroutine_threadsafe(self.message_queue.put(message), self.loop)
+            if self.loop and self.loop.is_running() and self.message_queue is not None:
+                with self.handoff_lock:
+                    self.handoff.append(message)
+                    if self.handoff_scheduled:
+                        return
+                    self.handoff_scheduled = True
+                try:
+                    self.loop.call_soon_threadsafe(self._drain_handoff)
+                except RuntimeError:
+                    # Loop closed between the check and the call
+                    with self.handoff_lock:
+                        self.handoff_scheduled = False
         except Exception as e:
             logging.error(f"[PwnIOS] Error queuing message: {e}")
 
+    def _drain_handoff(self):
+        # Unbounded on purpose: overflow is handled by the broadcast queue's per-type drop policies
+        with self.handoff_lock:
+            batch, self.handoff = self.handoff, deque()
+            self.handoff_scheduled = False
+        self.metrics.incr('broadcast.handoff_drains')
+        for message in batch:
+            self._enqueue_broadcast(message)
+
+    def _enqueue_broadcast(self, message):
+        if self.event_coalescer and self.event_coalescer.offer(message):
+            return
+        self._put_broadcast(message)
+
+    def _put_broadcast(self, message):
+        # Queued with its enqueue time so the broadcaster can report queue wait
+        pending = self.message_queue
+        if len(pending) >= self.message_queue_size:
+            if MESSAGE_POLICIES.get(message.get('type')) != POLICY_NEVER_DROP:
+                self.metrics.incr('broadcast.queue_dropped')
+                logging.warning(f"[PwnIOS] Broadcast queue full, dropping {message.get('type')}")
+                return
+            # Make room for must-deliver events at the expense of the oldest droppable one,
+            # never another must-deliver event; if nothing is droppable the queue grows past
+            # the bound, same as _ClientOutbox._shed
+            for queued in pending:
+                if MESSAGE_POLICIES.get(queued[1].get('type')) != POLICY_NEVER_DROP:
+                    pending.remove(queued)
+                    self.metrics.incr('broadcast.queue_dropped')
+                    logging.warning(f"[PwnIOS] Broadcast queue full, dropping {queued[1].get('type')}")
+                    break
+        pending.append((time.perf_counter(), message))
+        self.message_wakeup.set()
+
     def _start_websocket_server(self):
+        try:
+            self._deferred_setup()
+        except Exception as e:
+            # Runs on this thread now rather than in on_loaded, so report it here or it only reaches stderr
+            logging.error(f"[PwnIOS] Deferred setup failed, websocket server not started: {e!r}")
+            return
+        if not self.running:
+            return
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
         try:
@@ -284,17 +2194,50 @@ class PwnIOS(plugins.Plugin):
 
     async def _run_server(self):
         try:
-            self.message_queue = asyncio.Queue()
+            self.message_queue = deque()
+            self.message_wakeup = asyncio.Event()
+            self.message_queue_size = max(1, int(self.options.get('broadcast_queue_size', 256)))
+            self.event_coalescer = _EventCoalescer(
+                self.loop, self._put_broadcast,
+                window=self.options.get('event_coalesce_window', 0.5)
+            )
             self.broadcaster_task = asyncio.create_task(self._message_broadcaster())
             self.heartbeat_task = asyncio.create_task(self._heartbeat_checker())
+            metrics_log_interval = self.options.get('metrics_log_interval', 0)
+            if metrics_log_interval:
+                self.metrics_task = asyncio.create_task(self._metrics_logger(metrics_log_interval))
+
+            from concurrent.futures import ThreadPoolExecutor
+            workers = max(1, int(self.options.get('blocking_workers', 2)))
+            self.blocking_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwnios-blocking')
+            self.blocking_slots = asyncio.Semaphore(max(workers, int(self.options.get('blocking_queue_size', 16))))
+            loop_lag_warn_ms = self.options.get('loop_lag_warn_ms', 100)
+            if loop_lag_warn_ms:
+                self.loop_lag_task = asyncio.create_task(self._loop_lag_monitor(loop_lag_warn_ms))
             
+            if self.options.get('compression', True):
+                compression = {
+                    'compression': 'deflate',
+                    'extensions': _compression_extensions(
+                        threshold=self.options.get('compression_threshold', 256),
+                        window_bits=self.options.get('compression_window_bits', 11),
+                        mem_level=self.options.get('compression_mem_level', 4)
+                    )
+                }
+            else:
+                compression = {'compression': None}
+
+            port = int(self.options.get('port', 8082))
             self.websocket_server = await websockets.serve(
-                self._handle_client, "0.0.0.0", 8082,
+                self._handle_client, "0.0.0.0", port,
                 ping_interval=30, ping_timeout=20, close_timeout=10,
-                max_size=2**20, compression=None, max_queue=32
+                max_size=2**20, max_queue=32, **compression,
+                subprotocols=[codec.subprotocol for codec in _available_codecs()],
+                select_subprotocol=_select_subprotocol
             )
+            logging.info(f"[PwnIOS] Codecs: {', '.join(f'{c.subprotocol} ({c.backend})' for c in _available_codecs())}")
             
-            logging.info("[PwnIOS] WebSocket server started on port 8082")
+            logging.info(f"[PwnIOS] WebSocket server started on port {port}")
             await self.websocket_server.wait_closed()
             
         except Exception as e:
@@ -303,29 +2246,102 @@ class PwnIOS(plugins.Plugin):
             await self._cleanup_server_tasks()
 
     async def _cleanup_server_tasks(self):
-        for task in [self.broadcaster_task, self.heartbeat_task]:
+        if self.event_coalescer:
+            self.event_coalescer.cancel()
+        for task in [self.broadcaster_task, self.heartbeat_task, self.metrics_task, self.loop_lag_task]:
             if task:
                 task.cancel()
                 try: await task
                 except asyncio.CancelledError: pass
+        if self.blocking_executor:
+            self.blocking_executor.shutdown(wait=False, cancel_futures=True)
+            self.blocking_executor = None
+
+    async def _run_blocking(self, func, *args):
+        """Runs func(*args) on the blocking pool; see the threading rules in __init__.
+
+        At most blocking_queue_size jobs are queued or running; further callers wait
+        on the loop rather than piling work into the executor.
+        """
+        if self.blocking_executor is None:
+            return func(*args)
+        self.blocking_jobs += 1
+        try:
+            async with self.blocking_slots:
+                started = time.perf_counter()
+                try:
+                    return await self.loop.run_in_executor(self.blocking_executor, func, *args)
+                finally:
+                    self.metrics.observe(f"blocking.{getattr(func, '__name__', 'call')}",
+                                         (time.perf_counter() - started) * 1000)
+        finally:
+            self.blocking_jobs -= 1
+
+    async def _loop_lag_monitor(self, warn_ms):
+        # A sleep that wakes late means some callback held the loop for the difference. Sampling
+        # at the threshold catches every stall of twice the threshold and most shorter ones.
+        interval = min(1.0, max(0.05, warn_ms / 1000))
+        warned_at = 0.0
+        suppressed = 0
+        while self.running:
+            try:
+                expected = time.perf_counter() + interval
+                await asyncio.sleep(interval)
+                lag_ms = max(0.0, (time.perf_counter() - expected) * 1000)
+                self.metrics.observe('loop.lag', lag_ms)
+                if lag_ms < warn_ms:
+                    continue
+                self.metrics.incr('loop.stalls')
+                now = time.monotonic()
+                if now - warned_at < 30:
+                    suppressed += 1
+                    continue
+                extra = f" ({suppressed} more since the last warning)" if suppressed else ""
+                logging.warning(f"[PwnIOS] Event loop blocked for {lag_ms:.0f}ms (threshold {warn_ms}ms){extra}")
+                warned_at, suppressed = now, 0
+            except asyncio.CancelledError:
+                break
 
     async def _handle_client(self, websocket):
         client_addr = websocket.remote_address
         self.connected_clients.add(websocket)
         self.client_health[websocket] = time.time()
-        logging.info(f"[PwnIOS] iOS client connected: {client_addr}")
+        outbox = _ClientOutbox(
+            websocket, self._evict_client,
+            max_size=self.options.get('client_queue_size', 64),
+            send_timeout=self.options.get('client_send_timeout', 5.0),
+            evict_after=self.options.get('client_evict_after', 10.0),
+            metrics=self.metrics
+        )
+        self.client_outboxes[websocket] = outbox
+        outbox.start()
+        codec = _codec_for_subprotocol(getattr(websocket, 'subprotocol', None))
+        self.client_codecs[websocket] = codec
+        logging.info(f"[PwnIOS] iOS client connected: {client_addr} (codec: {codec.name}/{codec.backend})")
         
         try:
-            await self._send_initial_data(websocket)
+            params = self._connect_params(websocket)
+            if 'capabilities' in params:
+                # Same names as set_capabilities, e.g. ?capabilities=binary_images,ap_delta
+                requested = params['capabilities'][0].split(',')
+                self.client_capabilities[websocket] = {name for name in SUPPORTED_CAPABILITIES if name in requested}
+            if 'topics' in params:
+                # e.g. ?topics=handshake,status_change for widget-style clients
+                self.client_subscriptions[websocket] = _Subscription(
+                    [topic for topic in params['topics'][0].split(',') if topic])
+
+            resume = self._resume_request(params)
+            if resume is None or not self._resume_session(websocket, *resume):
+                await self._send_initial_data(websocket)
             
             async for message in websocket:
                 try:
                     self.client_health[websocket] = time.time()
-                    data = json.loads(message)
+                    data = codec.decode(message)
                     await self._handle_client_message(websocket, data)
-                except json.JSONDecodeError as e:
-                    logging.error(f"[PwnIOS] Invalid JSON: {message} - {e}")
-                    await self._send_error(websocket, "Invalid JSON format")
+                except codec.decode_errors as e:
+                    logging.error(f"[PwnIOS] Invalid {codec.name} message: {message!r:.200} - {e}")
+                    await self._send_error(websocket, f"Invalid {codec.name.upper()} format")
                 except Exception as e:
                     logging.error(f"[PwnIOS] Message error: {e}")
                     
@@ -334,12 +2350,107 @@ class PwnIOS(plugins.Plugin):
         except Exception as e:
             logging.error(f"[PwnIOS] Client error: {e}")
         finally:
-            self.connected_clients.discard(websocket)
-            self.client_health.pop(websocket, None)
+            self._forget_client(websocket)
             logging.info(f"[PwnIOS] Client disconnected: {client_addr}")
 
+    def _forget_client(self, websocket):
+        self.connected_clients.discard(websocket)
+        self.client_health.pop(websocket, None)
+        self.client_capabilities.pop(websocket, None)
+        self.client_stats_state.pop(websocket, None)
+        self.client_codecs.pop(websocket, None)
+        self.client_subscriptions.pop(websocket, None)
+        outbox = self.client_outboxes.pop(websocket, None)
+        # Not `if outbox:` - an empty outbox is falsy, and empty is the normal state here
+        if outbox is not None:
+            outbox.stop()
+
+    def _evict_client(self, websocket):
+        self._forget_client(websocket)
+        asyncio.ensure_future(self._close_quietly(websocket))
+
+    async def _close_quietly(self, websocket):
+        try: await websocket.close()
+        except: pass
+
+    def _codec_for(self, websocket):
+        return self.client_codecs.get(websocket) or _default_codec()
+
+    async def _send_message(self, websocket, message):
+        await websocket.send(self._codec_for(websocket).encode(message))
+
+    def _has_capability(self, websocket, capability):
+        return capability in self.client_capabilities.get(websocket, ())
+
+    def _wants_binary_images(self, websocket):
+        return self._has_capability(websocket, 'binary_images')
+
+    def _connect_params(self, websocket):
+        """Query parameters of the connect URL (websockets >= 14 exposes it as request.path)."""
+        request = getattr(websocket, 'request', None)
+        path = getattr(request, 'path', None) or getattr(websocket, 'path', None) or ''
+        return parse_qs(urlparse(path).query)
+
+    def _resume_request(self, params):
+        """(session, last_seq) from a ws://host:port/?session=...&last_seq=N connect URL, else None."""
+        if 'last_seq' not in params:
+            return None
+        try:
+            return params.get('session', [None])[0], int(params['last_seq'][0])
+        except ValueError:
+            return None
+
+    def _session_message(self, replayed=None):
+        """Session id and current seq, so the client can resume after a disconnect."""
+        return {
+            "type": "session",
+            "data": {
+                "session": self.session_id,
+                "seq": self.broadcast_seq,
+                "resumed": replayed is not None,
+                "replayed": replayed or 0
+            }
+        }
+
+    def _resume_session(self, websocket, session, last_seq):
+        """Queues broadcasts after last_seq; returns False if the client needs a full snapshot.
+
+        The session message for a failed resume goes out with the snapshot (_send_initial_data).
+        """
+        replay = None
+        if session == self.session_id and self.replay_floor <= last_seq <= self.broadcast_seq:
+            replay = [entry for entry in self.replay_buffer if entry.seq > last_seq]
+            replay.extend(entry for entry in self.replay_latest.values() if entry.seq > last_seq)
+            replay.sort(key=lambda entry: entry.seq)
+
+        outbox = self.client_outboxes.get(websocket)
+        if replay is None or outbox is None:
+            logging.info(f"[PwnIOS] Client {websocket.remote_address} resume from {last_seq} not possible, sending snapshot")
+            return False
+
+        # Session message and replay go through the outbox without yielding, so a live
+        # broadcast can't land between them or overtake the replayed events. They are
+        # pinned: the replay may be longer than client_queue_size and must not be shed.
+        outbox.put("session", self._codec_for(websocket).encode(self._session_message(len(replay))), pinned=True)
+        for entry in replay:
+            self._deliver(entry, websocket, pinned=True)
+        logging.info(f"[PwnIOS] Client {websocket.remote_address} resumed, replayed {len(replay)} events")
+        return True
+
+    @_message_handler('resume')
+    async def _handle_resume(self, websocket, data):
+        request = data.get('data', {}) or {}
+        try:
+            last_seq = int(request.get('last_seq'))
+        except (TypeError, ValueError):
+            await self._send_error(websocket, "resume requires an integer last_seq")
+            return
+        if not self._resume_session(websocket, request.get('session'), last_seq):
+            await self._send_initial_data(websocket)
+
     async def _send_initial_data(self, websocket):
         logging.info("[PwnIOS] Sending initial data")
+        await self._send_message(websocket, self._session_message())
         await self._send_stats(websocket)
         await self._send_access_points(websocket)
         await self._send_face_status(websocket)
@@ -347,7 +2458,13 @@ class PwnIOS(plugins.Plugin):
     async def _message_broadcaster(self):
         while self.running:
             try:
-                message = await asyncio.wait_for(self.message_queue.get(), timeout=1.0)
+                if not self.message_queue:
+                    self.message_wakeup.clear()
+                    # Timeout only so a stopped plugin is noticed
+                    await asyncio.wait_for(self.message_wakeup.wait(), timeout=1.0)
+                    continue
+                queued_at, message = self.message_queue.popleft()
+                self.metrics.observe('broadcast.queue_wait', (time.perf_counter() - queued_at) * 1000)
                 await self._broadcast_to_clients(message)
             except asyncio.TimeoutError:
                 continue
@@ -362,6 +2479,7 @@ class PwnIOS(plugins.Plugin):
             try:
                 await asyncio.sleep(45)
                 current_time = time.time()
+                self._expire_gps_fix()
                 
                 stale_clients = [
                     client for client, last_seen in self.client_health.items()
@@ -370,8 +2488,7 @@ class PwnIOS(plugins.Plugin):
                 
                 for client in stale_clients:
                     logging.info(f"[PwnIOS] Removing stale client: {client.remote_address}")
-                    self.connected_clients.discard(client)
-                    self.client_health.pop(client, None)
+                    self._forget_client(client)
                     try: await client.close()
                     except: pass
                 
@@ -387,37 +2504,151 @@ class PwnIOS(plugins.Plugin):
                 logging.error(f"[PwnIOS] Heartbeat checker error: {e}")
 
     async def _broadcast_to_clients(self, message):
-        if not self.connected_clients:
+        started = time.perf_counter()
+        self.broadcast_seq += 1
+        entry = _BroadcastEntry(self.broadcast_seq, message)
+        self.metrics.incr(f"broadcast.{entry.msg_type}")
+
+        # Recorded even with nobody connected: that's exactly the gap a resuming client missed.
+        # Coalescible types supersede themselves, so they keep one entry each outside the ring
+        # instead of pushing handshakes and deltas out of it.
+        if entry.msg_type not in REPLAY_SKIP_TYPES:
+            if MESSAGE_POLICIES.get(entry.msg_type) == POLICY_COALESCE:
+                # Keyed by audience too, so a capability-gated message (e.g. a filtered
+                # gps_update for gps_full_rate clients) can't displace the one everyone gets
+                self.replay_latest[(entry.msg_type, entry.only_for, entry.unless)] = entry
+            else:
+                if len(self.replay_buffer) == self.replay_buffer.maxlen:
+                    self.replay_floor = self.replay_buffer[0].seq
+                self.replay_buffer.append(entry)
+
+        # Hand the encoded message to each client's outbox; writers deliver independently
+        for client in list(self.connected_clients):
+            self._deliver(entry, client)
+        self.metrics.observe('broadcast.fanout', (time.perf_counter() - started) * 1000)
+
+    def _deliver(self, entry, client, pinned=False):
+        outbox = self.client_outboxes.get(client)
+        if outbox is None:
             return
-            
-        json_message = json.dumps(message)
-        dead_clients = set()
+        subscription = self.client_subscriptions.get(client)
+        if subscription is not None and not subscription.matches(entry.msg_type):
+            return
+        if entry.only_for and not self._has_capability(client, entry.only_for):
+            return
+        if entry.unless and self._has_capability(client, entry.unless):
+            return
+        if entry.binary_frame is not None and self._wants_binary_images(client):
+            outbox.put(entry.msg_type, entry.binary_frame, pinned)
+        else:
+            outbox.put(entry.msg_type, entry.payload_for(self._codec_for(client)), pinned)
+
+    def _has_subscribers(self, msg_type):
+        """True if any connected client would receive a broadcast of msg_type.
+
+        Lets producers skip building payloads (face images, AP lists) nobody wants.
+        Safe to call from the agent thread.
+        """
+        subscriptions = self.client_subscriptions
+        for client in list(self.connected_clients):
+            subscription = subscriptions.get(client)
+            if subscription is None or subscription.matches(msg_type):
+                return True
+        return False
+
+    @_message_handler('subscribe', 'unsubscribe')
+    async def _handle_subscription(self, websocket, data):
+        subscribe = data.get('type') == 'subscribe'
+        request = data.get('data', {}) or {}
+        topics = request.get('topics', [])
+        if isinstance(topics, str):
+            topics = [topics]
+        if not all(isinstance(topic, str) for topic in topics):
+            await self._send_error(websocket, "topics must be a list of strings")
+            return
+
+        subscription = self.client_subscriptions.get(websocket)
+        if subscription is None:
+            # First subscribe narrows from "everything" to just the requested topics
+            subscription = _Subscription(() if subscribe else ('*',))
+            self.client_subscriptions[websocket] = subscription
+        if subscribe:
+            subscription.subscribe(topics)
+        else:
+            subscription.unsubscribe(topics)
 
-        async def send_to_client(client):
+        await self._send_message(websocket, {
+            "type": "subscriptions",
+            "data": subscription.describe()
+        })
+
+    def _metrics_snapshot(self):
+        snapshot = self.metrics.snapshot()
+        snapshot['gauges'] = {
+            'clients': len(self.connected_clients),
+            'broadcast_queue': len(self.message_queue) if self.message_queue is not None else 0,
+            'handoff': len(self.handoff),
+            'blocking_jobs': self.blocking_jobs,
+            'client_queues': {
+                f"{outbox.websocket.remote_address}": len(outbox)
+                for outbox in list(self.client_outboxes.values())
+            },
+            'broadcast_seq': self.broadcast_seq,
+            'replay_buffer': len(self.replay_buffer) + len(self.replay_latest),
+        }
+        snapshot['components'] = {
+            'face_cache': self.face_cache.stats(),
+            'stats_cache': self.stats_cache.stats(),
+            'request_coalescer': self.request_coalescer.stats(),
+            'event_coalescer': self.event_coalescer.stats() if self.event_coalescer else None,
+            'gps_log': self.gps_log_writer.stats() if self.gps_log_writer else None,
+            'gps_sidecars': self.sidecar_writer.stats() if self.sidecar_writer else None,
+            'gps_filter': self.gps_filter.stats(),
+            'handshake_index': self.handshake_index.stats() if self.handshake_index else None,
+            'battery_backoff': self.sensor_sampler.battery_backoff if self.sensor_sampler else None,
+        }
+        return snapshot
+
+    @_message_handler('get_metrics')
+    async def _send_metrics(self, websocket, data=None):
+        await self._send_message(websocket, {
+            "type": "metrics",
+            "data": self._metrics_snapshot()
+        })
+
+    async def _metrics_logger(self, interval):
+        while self.running:
             try:
-                await asyncio.wait_for(client.send(json_message), timeout=5.0)
-            except asyncio.TimeoutError:
-                logging.warning(f"[PwnIOS] Send timeout to client: {client.remote_address}")
-                dead_clients.add(client)
+                await asyncio.sleep(interval)
+                snapshot = self._metrics_snapshot()
+                latency = snapshot['latency']
+                fanout = latency.get('broadcast.fanout', {})
+                wait = latency.get('broadcast.queue_wait', {})
+                send = latency.get('client.send', {})
+                slowest = max(
+                    ((name, h['p99_ms']) for name, h in latency.items() if name.startswith('handler.')),
+                    key=lambda item: item[1], default=(None, 0)
+                )
+                logging.info(
+                    f"[PwnIOS] Metrics: clients={snapshot['gauges']['clients']} "
+                    f"queue={snapshot['gauges']['broadcast_queue']} "
+                    f"queue_wait_p99={wait.get('p99_ms', 0)}ms fanout_p99={fanout.get('p99_ms', 0)}ms "
+                    f"send_p99={send.get('p99_ms', 0)}ms "
+                    f"dropped={snapshot['counters'].get('client.dropped', 0)} "
+                    f"evicted={snapshot['counters'].get('client.evicted', 0)} "
+                    f"slowest_handler={slowest[0]}:{slowest[1]}ms"
+                )
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                logging.warning(f"[PwnIOS] Send error to client: {e}")
-                dead_clients.add(client)
-
-        await asyncio.gather(
-            *[send_to_client(client) for client in list(self.connected_clients)], 
-            return_exceptions=True
-        )
-        
-        for client in dead_clients:
-            self.connected_clients.discard(client)
-            self.client_health.pop(client, None)
+                logging.error(f"[PwnIOS] Metrics logger error: {e}")
 
     async def _send_error(self, websocket, error_message):
         try:
-            await websocket.send(json.dumps({
+            await self._send_message(websocket, {
                 "type": "error",
                 "message": error_message
-            }))
+            })
         except Exception as e:
             logging.error(f"[PwnIOS] Error sending error response: {e}")
 
@@ -425,78 +2656,73 @@ class PwnIOS(plugins.Plugin):
         msg_type = data.get('type')
         message_id = data.get('message_id')
         
-        handlers = {
-            'get_stats': lambda: self._send_stats(websocket),
-            'get_access_points': lambda: self._send_access_points(websocket),
-            'get_face_status': lambda: self._send_face_status(websocket),
-            'get_face_image': lambda: self._handle_face_image_request(websocket),
-            'set_mode': lambda: self._handle_set_mode(websocket, data),
-            'reboot': lambda: self._handle_reboot(websocket),
-            'shutdown': lambda: self._handle_shutdown(websocket),
-            'bored': lambda: self._handle_bored(websocket),
-            'ping': lambda: self._handle_ping(websocket),
-            'pong': lambda: self._handle_pong(websocket),
-            'gps_data': lambda: self._handle_gps_data(websocket, data),
-            'get_gps_data': lambda: self._send_gps_data(websocket),
-        }
-        
+        handler = MESSAGE_HANDLERS.get(msg_type)
+        if handler is None:
+            self.metrics.incr('messages_in.unknown')
+            await self._send_error(websocket, f"Unknown message type: {msg_type}")
+            return
+
         try:
-            handler = handlers.get(msg_type)
-            if handler:
-                await handler()
-                if message_id:
-                    await websocket.send(json.dumps({
-                        "type": "acknowledgment",
-                        "message_id": message_id,
-                        "original_type": msg_type
-                    }))
-            else:
-                await self._send_error(websocket, f"Unknown message type: {msg_type}")
+            self.metrics.incr(handler.metric)
+            if handler.requires_agent and not self.agent:
+                logging.warning(f"[PwnIOS] Agent not ready, ignoring {msg_type}")
+                await self._send_error(websocket, f"Pwnagotchi agent not ready, cannot handle {msg_type}.")
+                return
+            started = time.perf_counter()
+            await handler.func(self, websocket, data)
+            self.metrics.observe(handler.timer, (time.perf_counter() - started) * 1000)
+            if message_id and handler.ack:
+                await self._send_message(websocket, {
+                    "type": "acknowledgment",
+                    "message_id": message_id,
+                    "original_type": msg_type
+                })
         except Exception as e:
+            self.metrics.incr(handler.error_metric)
             logging.error(f"[PwnIOS] Error handling message type {msg_type}: {e}")
             await self._send_error(websocket, f"Error processing {msg_type}")
 
+    @_message_handler('set_mode', requires_agent=True)
     async def _handle_set_mode(self, websocket, data):
         mode = data.get('data', {}).get('mode', 'auto').lower()
 
-        if self.agent:
-            logging.info(f"[PwnIOS] Attempting to set agent mode to: {mode}")
-            self.agent.mode = mode
-            if mode == 'auto':
-                logging.info(f"[PwnIOS] Agent mode set to AUTO. Pwnagotchi's main loop should react.")
-            elif mode == 'manual':
-                logging.info(f"[PwnIOS] Agent mode set to MANUAL. Pwnagotchi's main loop should react.")
-        else:
-            logging.warning("[PwnIOS] Agent not ready, cannot change mode.")
-            await self._send_error(websocket, "Pwnagotchi agent not ready, cannot change mode.")
+        logging.info(f"[PwnIOS] Attempting to set agent mode to: {mode}")
+        self.agent.mode = mode
+        if mode == 'auto':
+            logging.info(f"[PwnIOS] Agent mode set to AUTO. Pwnagotchi's main loop should react.")
+        elif mode == 'manual':
+            logging.info(f"[PwnIOS] Agent mode set to MANUAL. Pwnagotchi's main loop should react.")
 
-    async def _handle_reboot(self, websocket):
+    @_message_handler('reboot')
+    async def _handle_reboot(self, websocket, data=None):
         if self.agent and hasattr(self.agent, 'reboot'):
             try:
-                self.agent.reboot()
+                await self._run_blocking(self.agent.reboot)
             except Exception as e:
                 logging.error(f"[PwnIOS] Reboot error: {e}")
         else:
             try:
                 import subprocess
-                subprocess.run(['sudo', 'reboot'], check=True)
+                await self._run_blocking(lambda: subprocess.run(['sudo', 'reboot'], check=True))
             except Exception as e:
                 logging.error(f"[PwnIOS] System reboot error: {e}")
                 
-    async def _handle_shutdown(self, websocket):
+    @_message_handler('shutdown')
+    async def _handle_shutdown(self, websocket, data=None):
         if self.agent and hasattr(self.agent, 'shutdown'):
             try:
-                self.agent.shutdown()
+                await self._run_blocking(self.agent.shutdown)
             except Exception as e:
                 logging.error(f"[PwnIOS] Shutdown error: {e}")
         else:
             try:
                 import subprocess
-                subprocess.run(['sudo', 'shutdown'], check=True)
+                await self._run_blocking(lambda: subprocess.run(['sudo', 'shutdown'], check=True))
             except Exception as e:
                 logging.error(f"[PwnIOS] System shutdown error: {e}")
 
-    async def _handle_bored(self, websocket):
+    @_message_handler('bored')
+    async def _handle_bored(self, websocket, data=None):
         if self.agent and hasattr(self.agent, 'set_bored'):
             try:
                 self.agent.set_bored()
@@ -505,53 +2731,98 @@ class PwnIOS(plugins.Plugin):
         elif self.agent and hasattr(self.agent, '_state'):
             self.agent._state = 'bored'
         else:
-            await websocket.send(json.dumps({
+            await self._send_message(websocket, {
                 "type": "response", 
                 "message": "Bored state not supported"
-            }))
+            })
 
-    async def _handle_ping(self, websocket):
-        await websocket.send(json.dumps({
+    @_message_handler('ping')
+    async def _handle_ping(self, websocket, data=None):
+        await self._send_message(websocket, {
             "type": "pong",
             "timestamp": time.time()
-        }))
+        })
 
-    async def _handle_pong(self, websocket):
+    @_message_handler('pong', ack=False)
+    async def _handle_pong(self, websocket, data=None):
         logging.debug(f"[PwnIOS] Received pong from {websocket.remote_address}")
 
-    async def _handle_face_image_request(self, websocket):
+    @_message_handler('set_capabilities')
+    async def _handle_set_capabilities(self, websocket, data):
+        requested = data.get('data', {}) or {}
+        capabilities = {name for name in SUPPORTED_CAPABILITIES if requested.get(name)}
+        self.client_capabilities[websocket] = capabilities
+        # Any delta baseline belongs to the previous negotiation
+        self.client_stats_state.pop(websocket, None)
+        logging.info(f"[PwnIOS] Client {websocket.remote_address} capabilities: {sorted(capabilities)}")
+
+        response = {name: name in capabilities for name in SUPPORTED_CAPABILITIES}
+        response['binary_frame_version'] = BINARY_FRAME_VERSION
+        await self._send_message(websocket, {
+            "type": "capabilities",
+            "data": response
+        })
+
+    @_message_handler('get_face_image')
+    async def _handle_face_image_request(self, websocket, data=None):
         try:
             logging.info("[PwnIOS] get_face_image request received")
             
             face_name, status = self._get_current_face_and_status()
             logging.info(f"[PwnIOS] Current face: {face_name}, status: {status}")
+
+            if self._wants_binary_images(websocket):
+                def read_frame():
+                    image_bytes = self._get_face_image_bytes(face_name)
+                    return self._face_image_frame(image_bytes, face_name, status) if image_bytes else None
+
+                async def build_frame():
+                    return await self._run_blocking(read_frame)
+
+                frame = await self.request_coalescer.get(('face_frame', face_name, status), build_frame)
+                if frame:
+                    await websocket.send(frame)
+                    logging.info("[PwnIOS] Face image sent successfully (binary)")
+                    return
             
-            image_data = self._get_face_image(face_name)
-            
-            response = {
-                "type": "face_image",
-                "data": image_data,
-                "face": face_name,
-                "face_name": face_name,
-                "status": status,
-                "timestamp": time.time()
-            }
-            
-            await websocket.send(json.dumps(response))
+            async def build_response():
+                return _SharedResponse({
+                    "type": "face_image",
+                    "data": await self._run_blocking(self._get_face_image, face_name),
+                    "face": face_name,
+                    "face_name": face_name,
+                    "status": status,
+                    "timestamp": time.time()
+                })
+
+            # Requests for the same face share one file read, base64 encode and codec encode
+            response = await self.request_coalescer.get(('face_image', face_name, status), build_response)
+            await websocket.send(response.payload_for(self._codec_for(websocket)))
             logging.info("[PwnIOS] Face image sent successfully")
             
         except Exception as e:
             logging.error(f"[PwnIOS] get_face_image error: {e}")
-            await websocket.send(json.dumps({
+            await self._send_message(websocket, {
                 "type": "face_image", 
                 "data": None,
                 "error": str(e)
-            }))
+            })
 
-    async def _send_stats(self, websocket):
+    @_message_handler('get_stats')
+    async def _send_stats(self, websocket, data=None):
         try:
-            stats = self._get_stats_from_agent()
+            # A fresh snapshot is served inline; only a rebuild (agent introspection) goes to the pool
+            stats = self.stats_cache.peek()
+            if stats is None:
+                stats = await self._run_blocking(self.stats_cache.get)
             face, status = self._get_current_face_and_status()
+
+            if self._has_capability(websocket, 'stats_delta'):
+                request = (data or {}).get('data', {}) or {}
+                response = self._build_stats_delta(websocket, stats, face, status, request)
+                await self._send_message(websocket, response)
+                logging.debug(f"[PwnIOS] Stats {response['type']} v{response['version']} sent to {websocket.remote_address}")
+                return
             
             response = {
                 "type": "stats",
@@ -561,13 +2832,59 @@ class PwnIOS(plugins.Plugin):
                 "timestamp": time.time()
             }
             
-            await websocket.send(json.dumps(response))
+            await self._send_message(websocket, response)
             logging.debug(f"[PwnIOS] Stats sent to {websocket.remote_address}")
             
         except Exception as e:
             logging.error(f"[PwnIOS] Error sending stats: {e}")
             await self._send_error(websocket, f"Error getting stats: {str(e)}")
 
+    def _build_stats_delta(self, websocket, stats, face, status, request):
+        """Diff against what this client last received; fall back to a full snapshot
+        when the client asks for one, has no baseline yet, or reports a different version."""
+        state = self.client_stats_state.get(websocket)
+        client_version = request.get('version')
+        needs_full = (
+            state is None
+            or request.get('full')
+            or (client_version is not None and client_version != state['version'])
+        )
+
+        version = state['version'] + 1 if state else 1
+        self.client_stats_state[websocket] = {
+            'version': version,
+            'data': stats,
+            'face': face,
+            'status': status
+        }
+
+        if needs_full:
+            return {
+                "type": "stats",
+                "full": True,
+                "version": version,
+                "data": stats,
+                "face": face,
+                "status": status,
+                "timestamp": time.time()
+            }
+
+        changed, removed = _diff_stats(state['data'], stats)
+        response = {
+            "type": "stats_delta",
+            "version": version,
+            "base_version": state['version'],
+            "changed": changed,
+            "timestamp": time.time()
+        }
+        if removed:
+            response['removed'] = removed
+        if face != state['face']:
+            response['face'] = face
+        if status != state['status']:
+            response['status'] = status
+        return response
+
     def _get_stats_from_agent(self):
         stats = {
             'uptime': 0,
@@ -624,7 +2941,7 @@ class PwnIOS(plugins.Plugin):
                     handshakes = self.agent.handshakes
                     stats['handshakes'] = len(handshakes) if handshakes else 0
                     if handshakes and len(handshakes) > 0:
-                        last = list(handshakes.values())[-1] if isinstance(handshakes, dict) else handshakes[-1]
+                        last = next(reversed(handshakes.values())) if isinstance(handshakes, dict) else handshakes[-1]
                         stats['lastHandshake'] = {
                             'filename': last.get('filename', ''),
                             'access_point': last.get('access_point', ''),
@@ -639,7 +2956,7 @@ class PwnIOS(plugins.Plugin):
                     peers = self.agent.peers
                     stats['peers'] = len(peers) if peers else 0
                     if peers and len(peers) > 0:
-                        last_peer = list(peers.values())[-1] if isinstance(peers, dict) else peers[-1]
+                        last_peer = next(reversed(peers.values())) if isinstance(peers, dict) else peers[-1]
                         stats['lastPeer'] = {
                             'peer': str(last_peer.get('peer', last_peer)) if isinstance(last_peer, dict) else str(last_peer),
                             'timestamp': last_peer.get('timestamp', '') if isinstance(last_peer, dict) else datetime.now().isoformat()
@@ -668,10 +2985,28 @@ class PwnIOS(plugins.Plugin):
 
         return stats
 
-    async def _send_access_points(self, websocket):
-        access_points = []
+    @_message_handler('get_access_points')
+    async def _send_access_points(self, websocket, data=None):
+        wants_delta = self._has_capability(websocket, 'ap_delta')
+        if wants_delta:
+            async def build_snapshot():
+                seq, access_points = self.ap_index.snapshot()
+                if not seq:
+                    return None
+                return _SharedResponse({
+                    "type": "access_points",
+                    "seq": seq,
+                    "data": access_points
+                })
 
-        if self.agent:
+            response = await self.request_coalescer.get(('access_points', 'index'), build_snapshot)
+            if response:
+                await websocket.send(response.payload_for(self._codec_for(websocket)))
+                return
+
+        def read_from_agent():
+            if not self.agent:
+                return []
             try:
                 if hasattr(self.agent, 'access_points'):
                     raw_aps = self.agent.access_points
@@ -680,46 +3015,46 @@ class PwnIOS(plugins.Plugin):
                 else:
                     raw_aps = []
 
-                for ap in raw_aps:
-                    if isinstance(ap, dict):
-                        access_points.append({
-                            'bssid': ap.get('bssid', ''),
-                            'hostname': ap.get('hostname', ap.get('ssid', '')),
-                            'channel': ap.get('channel', 0),
-                            'rssi': ap.get('rssi', 0),
-                            'encryption': ap.get('encryption', ''),
-                            'vendor': ap.get('vendor', '')
-                        })
-                    else:
-                        access_points.append({
-                            'bssid': str(ap),
-                            'hostname': str(ap),
-                            'channel': 0,
-                            'rssi': 0,
-                            'encryption': '',
-                            'vendor': ''
-                        })
+                return [_format_access_point(ap) for ap in raw_aps]
 
             except Exception as e:
                 logging.error(f"[PwnIOS] Error getting access points from agent: {e}")
+                return []
+
+        async def build_from_agent():
+            access_points = await self._run_blocking(read_from_agent)
+
+            response = {
+                "type": "access_points", 
+                "data": access_points
+            }
+            if wants_delta:
+                response['seq'] = 0
+            return _SharedResponse(response)
 
-        await websocket.send(json.dumps({
-            "type": "access_points", 
-            "data": access_points
-        }))
+        response = await self.request_coalescer.get(('access_points', 'agent', wants_delta), build_from_agent)
+        await websocket.send(response.payload_for(self._codec_for(websocket)))
 
-    async def _send_face_status(self, websocket):
+    @_message_handler('get_face_status')
+    async def _send_face_status(self, websocket, data=None):
         face, status = self._get_current_face_and_status()
-        await websocket.send(json.dumps({
+        await self._send_message(websocket, {
             "type": "face_status", 
             "data": {
                 "face": face, 
                 "status": status,
                 "timestamp": datetime.now().isoformat()
             }
-        }))
+        })
 
     def _get_current_face_and_status(self):
+        # Tuple swap in on_ui_update is atomic, so readers on any thread need no lock
+        snapshot = self.face_snapshot
+        if snapshot is not None:
+            return snapshot
+        return self._read_face_and_status()
+
+    def _read_face_and_status(self):
         try:
             if self.agent:
                 view = None
@@ -794,11 +3129,22 @@ class PwnIOS(plugins.Plugin):
         return 0
 
     def _get_battery_info(self):
-        """Get battery info with comprehensive error handling"""
+        # Latest sample from the background sampler; only reads the device if it isn't running
+        if self.sensor_sampler:
+            return self.sensor_sampler.battery
+        return self._read_battery_info()[0]
+
+    def _get_temperature(self):
+        if self.sensor_sampler:
+            return self.sensor_sampler.temperature
+        return self._read_temperature()[0]
+
+    def _read_battery_info(self):
+        """Get battery info with comprehensive error handling. Returns (text, level, charging)."""
         try:
             # Check if we have a functional PiSugar instance
             if self.pisugar is None:
-                return "N/A (No PiSugar)"
+                return "N/A (No PiSugar)", None, None
             
             # Try to get battery level
             try:
@@ -807,8 +3153,8 @@ class PwnIOS(plugins.Plugin):
                 # Check for None or invalid values
                 if level is None:
                     if self.pisugar_error:
-                        return f"N/A ({self.pisugar_error[:30]}...)"
-                    return "N/A (Device not found)"
+                        return f"N/A ({self.pisugar_error[:30]}...)", None, None
+                    return "N/A (Device not found)", None, None
                 
                 # Try to get charging status
                 try:
@@ -819,29 +3165,39 @@ class PwnIOS(plugins.Plugin):
                     charging = False
                 
                 status = "Charging" if charging else "Discharging"
-                return f"{round(level, 1)}% ({status})"
+                return f"{round(level, 1)}% ({status})", level, charging
                 
             except AttributeError as ae:
                 # Handle 'NoneType' object has no attribute errors
                 if "'NoneType' object has no attribute" in str(ae):
                     if "No PiSugar device was found" in str(self.pisugar_error or ""):
-                        return "N/A (Update pisugarx.py)"
-                    return "N/A (Device offline)"
+                        return "N/A (Update pisugarx.py)", None, None
+                    return "N/A (Device offline)", None, None
                 else:
                     logging.warning(f"[PwnIOS] Battery attribute error: {ae}")
-                    return "N/A (Attr error)"
+                    return "N/A (Attr error)", None, None
                     
         except Exception as e:
             logging.warning(f"[PwnIOS] Battery info error: {e}")
-            return "N/A"
+            return "N/A", None, None
 
-    def _get_temperature(self):
+    def _read_temperature(self):
+        """Returns (text, celsius)."""
         try:
             with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                return f"{int(f.read().strip()) / 1000:.1f}°C"
+                celsius = int(f.read().strip()) / 1000
+                return f"{celsius:.1f}°C", celsius
         except Exception:
             pass
-        return "N/A"
+        return "N/A", None
+
+    @_message_handler('get_sensor_history')
+    async def _send_sensor_history(self, websocket, data=None):
+        history = self.sensor_sampler.history() if self.sensor_sampler else {"temperature": [], "battery": []}
+        await self._send_message(websocket, {
+            "type": "sensor_history",
+            "data": history
+        })
 
     def _get_face_image(self, face_name):
         logging.info(f"[PwnIOS] Requesting face image for: '{face_name}'")
@@ -853,7 +3209,7 @@ class PwnIOS(plugins.Plugin):
             try:
                 image_data = self.agent.get_face_image(face_name)
                 if image_data:
-                    return base64.b64encode(image_data).decode("utf-8")
+                    return binascii.b2a_base64(image_data, newline=False).decode("ascii")
             except Exception as e:
                 logging.error(f"[PwnIOS] Agent face image error: {e}")
 
@@ -863,52 +3219,40 @@ class PwnIOS(plugins.Plugin):
             current_face, _ = self._get_current_face_and_status()
             face_name = current_face
 
-        face_variations = [face_name, face_name.upper(), face_name.lower(), face_name.capitalize()]
-        base_paths = ["/custom-faces", "/etc/pwnagotchi/faces", "/home/pi/custom-faces"]
+        encoded = self.face_cache.get(face_name)
+        logging.debug(f"[PwnIOS] Face cache: {self.face_cache.stats()}")
+        return encoded
 
-        for base_path in base_paths:
-            for face_var in face_variations:
-                full_path = f"{base_path}/{face_var}.png"
-                if os.path.isfile(full_path):
-                    try:
-                        with open(full_path, "rb") as f:
-                            encoded = base64.b64encode(f.read()).decode("utf-8")
-                            logging.info(f"[PwnIOS] Found face image: {full_path}")
-                            return encoded
-                    except Exception as e:
-                        logging.error(f"[PwnIOS] Error reading face file {full_path}: {e}")
+    def _get_face_image_bytes(self, face_name):
+        """Raw PNG counterpart of _get_face_image for binary-frame clients."""
+        if self.agent and hasattr(self.agent, 'get_face_image'):
+            try:
+                image_data = self.agent.get_face_image(face_name)
+                if image_data:
+                    return image_data
+            except Exception as e:
+                logging.error(f"[PwnIOS] Agent face image error: {e}")
 
-        return None
+        if (not face_name or
+            any(ord(char) > 127 for char in face_name) or
+            len(face_name) > 20):
+            face_name, _ = self._get_current_face_and_status()
+
+        return self.face_cache.get_bytes(face_name)
+
+    def _face_image_frame(self, image_bytes, face_name, status):
+        return _pack_binary_frame(FRAME_TYPE_FACE_IMAGE, {
+            "face": face_name,
+            "face_name": face_name,
+            "status": status,
+            "timestamp": time.time()
+        }, image_bytes)
     
     def on_handshake(self, agent, filename, access_point, client_station):
-        # Save GPS coordinates if available
-        if self.gps_data and self.gps_enabled:
-            logging.info("Location Data:")
-            logging.info(f"Latitude: {self.gps_data['latitude']}")
-            logging.info(f"Longitude: {self.gps_data['longitude']}")
-            logging.info(f"Accuracy: {self.gps_data['accuracy']}")
-            
-            gps_filename = filename.replace(".pcap", ".gps.json")
-            # avoid 0.000... measurements
-            if all([self.gps_data.get("latitude"), self.gps_data.get("longitude")]):
-                logging.info(f"saving GPS to {gps_filename} ({self.gps_data})")
-                try:
-                    gps_export = {
-                        "Latitude": self.gps_data['latitude'],
-                        "Longitude": self.gps_data['longitude'],
-                        "Accuracy": self.gps_data.get('accuracy', 0),
-                        "Timestamp": self.gps_data.get('last_update', datetime.now().isoformat())
-                    }
-                    with open(gps_filename, "w+t") as fp:
-                        json.dump(gps_export, fp)
-                except Exception as e:
-                    logging.error(f"[PwnIOS] Error saving GPS data: {e}")
-            else:
-                logging.info("[PwnIOS] not saving GPS. Couldn't find location.")
-        else:
-            logging.info("[PwnIOS] No GPS data available for handshake.")
-        
-        # Create handshake data for broadcasting
+        # Runs on the agent thread: everything slow (file I/O, verbose logging) goes to the sidecar writer
+        started = time.perf_counter()
+        gps_data = self.gps_data if self.gps_enabled else None
+
         handshake_data = {
             'filename': str(filename),
             'access_point': str(access_point),
@@ -916,13 +3260,32 @@ class PwnIOS(plugins.Plugin):
             'timestamp': datetime.now().isoformat()
         }
         
-        # Add GPS data to handshake if available
-        if self.gps_data and self.gps_enabled:
+        if gps_data:
             handshake_data['gps'] = {
-                'latitude': self.gps_data['latitude'],
-                'longitude': self.gps_data['longitude'],
-                'accuracy': self.gps_data.get('accuracy', 0)
+                'latitude': gps_data['latitude'],
+                'longitude': gps_data['longitude'],
+                'accuracy': gps_data.get('accuracy', 0)
             }
+            # avoid 0.000... measurements
+            if gps_data.get("latitude") and gps_data.get("longitude"):
+                gps_export = {
+                    "Latitude": gps_data['latitude'],
+                    "Longitude": gps_data['longitude'],
+                    "Accuracy": gps_data.get('accuracy', 0),
+                    "Timestamp": gps_data.get('last_update') or handshake_data['timestamp']
+                }
+                gps_filename = filename.replace(".pcap", ".gps.json")
+                writer = self.sidecar_writer
+                if writer is None:
+                    self.metrics.incr('sidecar.dropped')
+                    logging.warning(f"[PwnIOS] GPS sidecar writer not running, not saving {gps_filename}")
+                elif not writer.submit(gps_filename, gps_export):
+                    self.metrics.incr('sidecar.dropped')
+                    logging.warning(f"[PwnIOS] GPS sidecar queue full, not saving {gps_filename}")
+            else:
+                logging.debug("[PwnIOS] not saving GPS. Couldn't find location.")
+        else:
+            logging.debug("[PwnIOS] No GPS data available for handshake.")
         
         face, status = self._get_current_face_and_status()
         self.queue_message({
@@ -932,6 +3295,12 @@ class PwnIOS(plugins.Plugin):
             "status": status
         })
 
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.observe('agent.on_handshake', elapsed_ms)
+        budget_ms = self.options.get('handshake_budget_ms', 2.0)
+        if budget_ms and elapsed_ms > budget_ms:
+            logging.warning(f"[PwnIOS] on_handshake took {elapsed_ms:.2f}ms on the agent thread (budget {budget_ms}ms)")
+
     def on_peer_detected(self, agent, peer):
         peer_data = {
             'peer': str(peer), 
@@ -946,33 +3315,23 @@ class PwnIOS(plugins.Plugin):
         })
 
     def on_wifi_update(self, agent, access_points):
-        formatted_aps = []
-        for ap in access_points[:10]:
-            if isinstance(ap, dict):
-                formatted_aps.append({
-                    'bssid': ap.get('bssid', ''),
-                    'hostname': ap.get('hostname', ap.get('ssid', '')),
-                    'channel': ap.get('channel', 0),
-                    'rssi': ap.get('rssi', 0),
-                    'encryption': ap.get('encryption', ''),
-                    'vendor': ap.get('vendor', '')
-                })
-            else:
-                formatted_aps.append({
-                    'bssid': str(ap),
-                    'hostname': str(ap),
-                    'channel': 0,
-                    'rssi': 0,
-                    'encryption': '',
-                    'vendor': ''
-                })
-        
+        delta = self.ap_index.update(access_points)
+        if delta:
+            self.queue_message({
+                "type": "ap_delta",
+                "data": delta,
+                "_capability": 'ap_delta'
+            })
+
+        if not self._has_subscribers('wifi_update'):
+            return
         self.queue_message({
             "type": "wifi_update", 
             "data": {
                 "count": len(access_points),
-                "access_points": formatted_aps
-            }
+                "access_points": [_format_access_point(ap) for ap in access_points[:10]]
+            },
+            "_without_capability": 'ap_delta'
         })
 
     def on_channel_hop(self, agent, channel):
@@ -1008,6 +3367,10 @@ class PwnIOS(plugins.Plugin):
         })
 
     def on_ui_setup(self, ui):
+        import pwnagotchi.ui.fonts as fonts
+        from pwnagotchi.ui.components import LabeledValue
+        from pwnagotchi.ui.view import BLACK
+
         if self.options.get('display'):
             ui.add_element(
                 'ios_clients', 
@@ -1062,9 +3425,9 @@ class PwnIOS(plugins.Plugin):
             ui.set('gps_long', gps_long)
             ui.set('gps_lat', gps_lat)
         
-        self.ui_update_counter += 1
-        if self.ui_update_counter % 5 == 0:
-            self._check_face_status_changes()
+        # One view walk per UI tick; every other path reads the snapshot
+        self.face_snapshot = self._read_face_and_status()
+        self._check_face_status_changes()
 
     def _check_face_status_changes(self):
         try:
@@ -1086,16 +3449,24 @@ class PwnIOS(plugins.Plugin):
                     "status": current_status
                 })
                 
-                if self.connected_clients:
+                if self._has_subscribers('face_image'):
                     image_data = self._get_face_image(current_face)
                     if image_data:
-                        self.queue_message({
+                        message = {
                             "type": "face_image",
                             "data": image_data,
                             "face": current_face,
                             "status": current_status,
                             "timestamp": time.time()
-                        })
+                        }
+                        if any(self._wants_binary_images(c) for c in list(self.connected_clients)):
+                            image_bytes = self._get_face_image_bytes(current_face)
+                            if image_bytes:
+                                message['_binary'] = self._face_image_frame(image_bytes, current_face, current_status)
+                        self.queue_message(message)
                         
         except Exception as e:
             logging.error(f"[PwnIOS] Error in _check_face_status_changes: {e}")
+
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED